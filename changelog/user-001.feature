@@ -0,0 +1 @@
+Analyze benchmarks in parallel with ``mdbenchmark analyze --jobs``.
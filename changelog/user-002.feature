@@ -0,0 +1 @@
+Cache parsed log files with ``mdbenchmark analyze --cache``, so that only new or modified log files are parsed again.
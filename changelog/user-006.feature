@@ -0,0 +1 @@
+Plots are drawn from the results in memory. Writing the CSV file can be skipped with ``--no-csv``.
@@ -0,0 +1 @@
+Benchmarks are discovered faster. ``mdbenchmark analyze --index`` stores the discovered benchmarks for later runs.
@@ -0,0 +1 @@
+Parse the cycle and time accounting table of GROMACS log files into separate columns.
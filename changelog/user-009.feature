@@ -0,0 +1 @@
+The performance of NAMD benchmarks is averaged over all ``Benchmark time`` measurements and reported with its standard deviation.
@@ -0,0 +1 @@
+Show the speedup, parallel efficiency and node-hours and core-hours per ns in ``mdbenchmark analyze``.
@@ -0,0 +1 @@
+Fit Amdahl's law and the universal scalability law to the scaling curves instead of a two-point linear extrapolation.
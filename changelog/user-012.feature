@@ -0,0 +1 @@
+Recommend the number of nodes with ``mdbenchmark analyze --recommend`` and ``--min-efficiency``.
@@ -0,0 +1 @@
+Store the results of ``mdbenchmark analyze`` in Parquet or Feather files with ``--store``. Repeated analyses are merged into the store.
@@ -0,0 +1 @@
+Follow running benchmarks with ``mdbenchmark analyze --watch``. Only modified log files are parsed again.
@@ -0,0 +1 @@
+Plot several hosts and modules into one figure. Use ``--facet`` to draw subplots and ``--plot-format`` and ``--plot-name`` to choose the output file.
@@ -0,0 +1 @@
+Store results in an SQLite database with ``mdbenchmark analyze --store results.db`` and select them with the new ``mdbenchmark query`` command.
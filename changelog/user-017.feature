@@ -0,0 +1 @@
+Detect performance regressions against a baseline with the new ``mdbenchmark compare`` command.
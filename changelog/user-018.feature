@@ -0,0 +1 @@
+Parse the core time, wall time, hours per ns and CPU efficiency from GROMACS log files.
@@ -0,0 +1 @@
+Parse the domain decomposition, the number of PME ranks and the load balance from GROMACS log files.
@@ -0,0 +1 @@
+Link input files instead of copying them with ``mdbenchmark generate --staging``.
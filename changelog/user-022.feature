@@ -0,0 +1 @@
+Share input files between benchmarks through a content-addressed store with ``mdbenchmark generate --input-store``.
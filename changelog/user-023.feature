@@ -0,0 +1 @@
+Generate benchmarks concurrently with ``mdbenchmark generate --jobs``.
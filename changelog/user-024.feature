@@ -0,0 +1 @@
+Sweep the number of MPI ranks per node and OpenMP threads with ``mdbenchmark generate --ranks`` and ``--threads``.
@@ -0,0 +1 @@
+Sweep the GROMACS mdrun options ``-npme``, ``-nb``, ``-pme`` and ``-dlb`` with ``mdbenchmark generate``.
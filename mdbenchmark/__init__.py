@@ -27,6 +27,6 @@ with warnings.catch_warnings():
         category=FutureWarning,
         module='h5py')
 
-    from . import analyze, generate, submit
+    from . import analyze, compare, generate, query, submit
 
     __version__ = '1.3.0'
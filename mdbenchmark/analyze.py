@@ -19,99 +19,671 @@
 # along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
 import os
 import sys
+import time
+from collections import OrderedDict
 from glob import glob
+from multiprocessing.pool import ThreadPool
 
 import click
-import mdsynthesis as mds
 import numpy as np
 import pandas as pd
 from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
 from matplotlib.figure import Figure
 
 from . import console
+from .cache import AnalyzeCache
+from .discover import discover
 from .mdengines import detect_md_engine
+from .staging import INPUT_HASH
+from .store import STORE_KEY, store_format, write_store
 
 from .cli import cli
-from .utils import (calc_slope_intercept, guess_ncores, lin_func,
-                    generate_output_name)
+from .utils import amdahl, generate_output_name, guess_ncores, usl
+
+# Columns of the results returned by `analyze_run` and their data types.
+# `ncores` is a nullable integer, because it is missing for benchmarks that
+# did not start yet. Any further values parsed from the log files, e.g. the
+# GROMACS cycle accounting, are appended as additional columns.
+COLUMNS = [
+    'module', 'nodes', 'ns/day', 'run time [min]', 'gpu', 'host', 'ncores'
+]
+DTYPES = {
+    'module': 'category',
+    'nodes': 'int64',
+    'ns/day': 'float64',
+    'run time [min]': 'int64',
+    'gpu': 'bool',
+    'host': 'category',
+    'ncores': 'Int64',
+}
+
+
+# Benchmarks of the same group are compared with each other to calculate the
+# scaling columns.
+GROUP_COLUMNS = ['host', 'module', 'gpu']
+
+# Sim categories of the MPI ranks per node and OpenMP threads per rank of
+# benchmarks generated with a sweep over them. The layout is 0 for benchmarks
+# using the defaults of the job template.
+LAYOUT_COLUMNS = ['ranks', 'threads']
+# Sim categories of the GROMACS mdrun options of benchmarks generated with a
+# sweep over them. Without the option, mdrun uses its default.
+MDRUN_COLUMNS = ['npme', 'nb', 'pme', 'dlb']
+# Benchmarks with different values of any of these columns are in different
+# groups. Missing values are replaced by the defaults.
+SWEEP_COLUMNS = LAYOUT_COLUMNS + MDRUN_COLUMNS
+SWEEP_DEFAULTS = {
+    'ranks': 0,
+    'threads': 0,
+    'npme': -1,
+    'nb': 'auto',
+    'pme': 'auto',
+    'dlb': 'auto',
+}
+SCALING_COLUMNS = ['speedup', 'efficiency', 'node-hours/ns', 'core-hours/ns']
+
+# Parameters of Amdahl's law and the Universal Scalability Law fitted to each
+# group of benchmarks.
+FIT_COLUMNS = [
+    'amdahl ns/day', 'serial fraction', 'usl ns/day', 'contention',
+    'coherency', 'peak nodes'
+]
+
+# Columns of the recommended node counts of each group of benchmarks.
+RECOMMEND_COLUMNS = [
+    'nodes', 'ns/day', 'efficiency', 'cheapest nodes', 'cheapest ns/day',
+    'core-hours/ns'
+]
+
+# File formats of the plot.
+PLOT_FORMATS = ['pdf', 'png', 'svg']
+
+# Number of decimals of the printed columns
+PRINT_DECIMALS = {
+    'speedup': 2,
+    'efficiency': 2,
+    'node-hours/ns': 3,
+    'core-hours/ns': 2,
+    'amdahl ns/day': 3,
+    'serial fraction': 4,
+    'usl ns/day': 3,
+    'contention': 4,
+    'coherency': 5,
+    'peak nodes': 1,
+}
+
+
+def group_columns(df):
+    """Return the columns defining the groups of benchmarks in `df`.
+
+    These are the `GROUP_COLUMNS` followed by the `SWEEP_COLUMNS`, if any
+    benchmark was generated with a sweep over them.
+    """
+    return GROUP_COLUMNS + [c for c in SWEEP_COLUMNS if c in df]
+
+
+def series_label(columns, values):
+    """Return the label of a group of benchmarks in a plot."""
+    labels = []
+    for column, value in zip(columns, values):
+        if column == 'gpu':
+            value = 'GPU' if value else 'CPU'
+        elif column in SWEEP_COLUMNS:
+            # Default settings are not labeled.
+            if value == SWEEP_DEFAULTS[column]:
+                continue
+            if column in LAYOUT_COLUMNS:
+                value = '{} {}'.format(value, column)
+            else:
+                value = '-{} {}'.format(column, value)
+        labels.append(str(value))
+    return ' '.join(labels)
+
+
+def plot_analysis(df,
+                  ncores=None,
+                  facets=None,
+                  output_name='runtimes',
+                  output_format='pdf'):
+    """Plot the performance of the finished benchmarks.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Results of the analysis.
+    ncores : int
+        Number of cores per node. If not given, the number of cores parsed
+        from the log files is used for the upper axis.
+    facets : list
+        Any of the `GROUP_COLUMNS` and `SWEEP_COLUMNS`. Every combination of
+        their values is drawn into a separate subplot. The groups of the
+        remaining columns of `group_columns` are drawn into the same subplot.
+    output_name : str
+        Name of the plot file. The extension of `output_format` is appended if
+        missing.
+    output_format : str
+        One of the `PLOT_FORMATS`.
+    """
+    columns = group_columns(df)
+    facets = [column for column in columns if column in (facets or [])]
+    series = [column for column in columns if column not in facets]
+
+    # Remove NaN values. These are benchmarks that did not finish.
+    df = df.dropna(subset=['ns/day']).sort_values('nodes')
+    fits = fit_scaling(df)
+
+    # Assign all groups of benchmarks to their subplots in a single pass.
+    panels = OrderedDict()
+    for key, data in df.groupby([df[c] for c in facets + series],
+                                observed=True):
+        values = dict(zip(facets + series, key))
+        fit = fits.loc[tuple(values[c] for c in columns)]
+        panels.setdefault(key[:len(facets)], []).append(
+            (key[len(facets):], data, fit))
 
+    if ncores is not None:
+        console.info(
+            "Ncores overwritten from CLI. Ignoring values from simulation logs for plot."
+        )
+
+    ncols = min(len(panels), 3)
+    nrows = -(-len(panels) // ncols)
 
-def plot_analysis(df, ncores):
     # We have to use the matplotlib object-oriented interface directly, because
     # it expects a display to be attached to the system, which we don't on the
     # clusters.
-    f = Figure()
+    f = Figure(figsize=(6.4 * ncols, 4.8 * nrows))
     FigureCanvas(f)
-    ax = f.add_subplot(111)
 
-    # Remove NaN values. These are missing ncores/performance data.
-    df = df.dropna()
+    for i, (panel, lines) in enumerate(panels.items()):
+        ax = f.add_subplot(nrows, ncols, i + 1)
+        panel_df = pd.concat([data for _, data, _ in lines])
+        max_nodes = panel_df['nodes'].max()
+
+        for j, (line, data, fit) in enumerate(lines):
+            color = 'C{}'.format(j % 10)
+            ax.plot(
+                data['nodes'],
+                data['ns/day'],
+                '.-',
+                ms='10',
+                color=color,
+                label=series_label(series, line))
+            plot_fits(ax, fit, max_nodes, color)
+
+        nodes = np.sort(panel_df['nodes'].unique())
+        ax.set_xticks(nodes)
+        ax.set_xlabel('Number of nodes')
+        ax.set_ylabel('Performance [ns/day]')
+        ax.set_ylim(ymin=0, ymax=panel_df['ns/day'].max() * 1.2)
+        if facets:
+            ax.set_title(series_label(facets, panel))
+
+        # Only label the cores, if all benchmarks use the same number of
+        # cores per node.
+        cores_per_node = [ncores]
+        if ncores is None:
+            cores_per_node = (panel_df['ncores'].astype('float64') /
+                              panel_df['nodes']).dropna().unique()
+        if len(cores_per_node) == 1:
+            ax2 = ax.twiny()
+            ax2.set_xticks(nodes)
+            ax2.set_xbound(ax.get_xbound())
+            ax2.set_xticklabels(
+                (nodes * cores_per_node[0]).astype(int))
+            ax2.set_xlabel('Cores')
+
+        if series:
+            ax.legend()
 
-    max_x = df['nodes'].max()
-    max_y = df['ns/day'].max()
+    f.tight_layout()
 
-    if not max_y:
-        max_y = 50
+    extension = '.{}'.format(output_format)
+    if not output_name.endswith(extension):
+        output_name += extension
+    f.savefig(output_name, format=output_format)
 
-    y_tick_steps = 10
-    if max_y > 100:
-        y_tick_steps = 20
 
-    x = np.arange(1, max_x + 1, 1)
+def plot_fits(ax, fit, max_nodes, color):
+    """Plot the fitted scaling models of a group of benchmarks.
 
-    if not df[~df['gpu']].empty:
-        cpu_data = df[(~df['gpu'])].sort_values('nodes').reset_index()
-        ax.plot(cpu_data['ns/day'], '.-', ms='10', color='C0', label='CPU')
-        slope, intercept = calc_slope_intercept(x[0], cpu_data['ns/day'][0],
-                                                x[1], cpu_data['ns/day'][1])
+    Amdahl's law is drawn dashed, the Universal Scalability Law dotted.
+    """
+    x = np.linspace(1, max_nodes, 100)
+    if not np.isnan(fit['serial fraction']):
         ax.plot(
-            x - 1,
-            lin_func(x, slope, intercept),
+            x,
+            amdahl(x, fit['amdahl ns/day'], fit['serial fraction']),
             ls='dashed',
-            color='C0',
+            color=color,
             alpha=0.5)
-
-    gpu_data = df[(df['gpu'])].sort_values('nodes').reset_index()
-    if not gpu_data.empty:
-
-        ax.plot(gpu_data['ns/day'], '.-', ms='10', color='C1', label='GPU')
-        slope, intercept = calc_slope_intercept(x[0], gpu_data['ns/day'][0],
-                                                x[1], gpu_data['ns/day'][1])
+    if not np.isnan(fit['contention']):
         ax.plot(
-            x - 1,
-            lin_func(x, slope, intercept),
-            ls='dashed',
-            color='C1',
+            x,
+            usl(x, fit['usl ns/day'], fit['contention'], fit['coherency']),
+            ls='dotted',
+            color=color,
             alpha=0.5)
 
-    ax.set_xticks(x - 1)
-    ax.set_xticklabels(x)
 
-    axTicks = ax.get_xticks()
+def parse_benchmark(sim, engine):
+    """Parse the log file of a benchmark.
 
-    ax2 = ax.twiny()
-    ax2.set_xticks(axTicks)
-    ax2.set_xbound(ax.get_xbound())
-    if ncores is not None:
-        console.info(
-            "Ncores overwritten from CLI. Ignoring values from simulation logs for plot."
-        )
-        ax2.set_xticklabels(x for x in (axTicks + 1) * ncores)
-    else:
-        ax2.set_xticklabels(cpu_data['ncores'])
+    Returns
+    -------
+    dict
+        Parsed values, as returned by `engine.parse_output_file`. Empty, if
+        the benchmark did not write a log file (yet).
+    """
+    output_file = engine.find_output_file(sim)
+    if output_file is None:
+        return {}
 
-    ax.set_xlabel('Number of nodes')
-    ax.set_ylabel('Performance [ns/day]')
+    return engine.parse_output_file(output_file)
 
-    ax.set_yticks(np.arange(0, (max_y + (max_y * 0.5)), y_tick_steps))
-    ax.set_ylim(ymin=0, ymax=(max_y + (max_y * 0.2)))
 
-    ax2.set_xlabel('{}'.format('{}\n\nCores'.format(df['host'][0])))
+def analyze_benchmark(sim, cache=None):
+    """Run the engine specific analysis of a single benchmark.
 
-    ax.legend()
+    If a `cache` is given, unchanged log files are not parsed again.
 
-    f.tight_layout()
-    f.savefig('runtimes.pdf', format='pdf')
+    Returns
+    -------
+    dict
+        Results keyed by column name. Contains all `COLUMNS` and any further
+        values parsed from the log file.
+    """
+    # older versions wrote a version category. This ensures backwards compatibility
+    if 'module' in sim.categories:
+        module = sim.categories['module']
+    else:
+        module = sim.categories['version']
+    engine = detect_md_engine(module)
+
+    if cache is not None:
+        values = cache.parse(sim, engine)
+    else:
+        values = parse_benchmark(sim, engine)
+
+    # call the engine specific analysis functions
+    row = dict(zip(COLUMNS, engine.analyze_run(sim, values)))
+    row[STORE_KEY] = sim.uuid
+    for name in SWEEP_COLUMNS:
+        if name in sim.categories:
+            row[name] = sim.categories[name]
+    if INPUT_HASH in sim.categories:
+        row['input hash'] = sim.categories[INPUT_HASH]
+    for name, value in values.items():
+        row.setdefault(name, value)
+
+    return row
+
+
+def analyze_bundle(bundle, jobs=1, cache=None):
+    """Analyze all benchmarks of a bundle.
+
+    Parameters
+    ----------
+    bundle : iterable of Sim / Benchmark
+        Benchmarks to analyze.
+    jobs : int
+        Number of benchmarks to analyze concurrently. Parsing the log files is
+        bound by file system latency, so we use a pool of threads.
+    cache : AnalyzeCache
+        Cache of already parsed log files.
+
+    Returns
+    -------
+    list of dict
+        Results of `analyze_benchmark` in the same order as `bundle`.
+    """
+    if jobs <= 1:
+        return [analyze_benchmark(sim, cache) for sim in bundle]
+
+    pool = ThreadPool(jobs)
+    try:
+        # `map` keeps the order of the input, so the result is identical to
+        # the serial analysis.
+        return pool.map(lambda sim: analyze_benchmark(sim, cache), bundle)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def build_dataframe(rows):
+    """Assemble the results of `analyze_benchmark` into a DataFrame.
+
+    The results are collected column by column and each column is converted
+    to its data type once, instead of growing the DataFrame row by row.
+
+    Parameters
+    ----------
+    rows : list of dict
+        Results of `analyze_benchmark`, keyed by column name.
+
+    Returns
+    -------
+    pandas.DataFrame
+        All `COLUMNS`, followed by the additional columns in alphabetical
+        order. Missing values are NaN, except for the `SWEEP_COLUMNS`, which
+        default to the `SWEEP_DEFAULTS`.
+    """
+    extra_columns = set()
+    for row in rows:
+        extra_columns.update(row)
+    columns = COLUMNS + sorted(extra_columns.difference(COLUMNS))
+
+    data = {}
+    for name in columns:
+        default = SWEEP_DEFAULTS.get(name, np.nan)
+        data[name] = pd.Series([row.get(name, default) for row in rows],
+                               dtype=DTYPES.get(name))
+    return pd.DataFrame(data, columns=columns)
+
+
+def calc_scaling(df, baseline_nodes=None, ncores=None):
+    """Calculate the scaling of each group of benchmarks.
+
+    For each group of benchmarks with equal `group_columns`, the speedup and
+    the parallel efficiency are calculated relative to the benchmark with the
+    baseline number of nodes. The cost of a simulated nanosecond is given in
+    node-hours and core-hours.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Results of the analysis.
+    baseline_nodes : int
+        Number of nodes of the reference benchmark. If not given, the
+        finished benchmark with the smallest number of nodes of each group is
+        used. Groups without a finished baseline benchmark have no speedup
+        and efficiency.
+    ncores : int
+        Number of cores per node. If not given, the number of cores parsed
+        from the log files is used.
+
+    Returns
+    -------
+    pandas.DataFrame
+        `df` with the `SCALING_COLUMNS` inserted after the `COLUMNS`.
+    """
+    df = df.copy()
+    keys = [df[column] for column in group_columns(df)]
+    finished = df['ns/day'].notnull()
+
+    if baseline_nodes is None:
+        base_nodes = df['nodes'].where(finished).groupby(
+            keys, observed=True).transform('min')
+    else:
+        base_nodes = pd.Series(
+            float(baseline_nodes), index=df.index).where(finished)
+    base_ns_day = df['ns/day'].where(df['nodes'] == base_nodes).groupby(
+        keys, observed=True).transform('max')
+
+    df['speedup'] = df['ns/day'] / base_ns_day
+    df['efficiency'] = df['speedup'] * base_nodes.groupby(
+        keys, observed=True).transform('max') / df['nodes']
+
+    if ncores is None:
+        cores = df['ncores'].astype('float64')
+    else:
+        cores = df['nodes'] * ncores
+    df['node-hours/ns'] = 24 * df['nodes'] / df['ns/day']
+    df['core-hours/ns'] = 24 * cores / df['ns/day']
+
+    columns = [c for c in df.columns if c not in SCALING_COLUMNS]
+    columns[len(COLUMNS):len(COLUMNS)] = SCALING_COLUMNS
+    return df[columns]
+
+
+def _least_squares(sums, terms):
+    """Solve the normal equations of all groups at once.
+
+    Parameters
+    ----------
+    sums : pandas.DataFrame
+        Sums of the products of all `terms` with each other and with the
+        dependent variable `y` for each group. The column of the product of
+        `a` and `b` is named `ab`.
+    terms : list
+        Names of the terms of the linear model.
+
+    Returns
+    -------
+    numpy.ndarray
+        Coefficients of the terms for each group. NaN, if the group has fewer
+        different numbers of nodes than there are terms.
+    """
+    lhs = np.stack(
+        [np.stack([sums[a + b] for b in terms], axis=-1) for a in terms],
+        axis=-2)
+    rhs = np.stack([sums[a + 'y'] for a in terms], axis=-1)
+
+    coefficients = np.full(rhs.shape, np.nan)
+    solvable = (sums['n'] >= len(terms)).values
+    if solvable.any():
+        coefficients[solvable] = np.linalg.solve(lhs[solvable],
+                                                 rhs[solvable, :, None])[..., 0]
+    return coefficients
+
+
+def fit_scaling(df):
+    """Fit Amdahl's law and the Universal Scalability Law to each group.
+
+    Both models are linear in the inverse performance per node, `nodes /
+    ns/day`, so they are fitted with linear least squares. The normal
+    equations are accumulated with a single groupby and solved for all groups
+    of benchmarks at once.
+
+    Amdahl's law needs at least two, the Universal Scalability Law at least
+    three different numbers of nodes. Otherwise the parameters are NaN.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Results of the analysis.
+
+    Returns
+    -------
+    pandas.DataFrame
+        `FIT_COLUMNS` of each group, indexed by the `group_columns`. The peak
+        nodes are the number of nodes with the highest performance predicted
+        by the Universal Scalability Law. They are NaN if the performance
+        does not decrease.
+    """
+    df = df.dropna(subset=['ns/day'])
+    nodes = df['nodes'].astype('float64')
+    terms = {
+        'a': pd.Series(1., index=df.index),
+        'b': nodes - 1,
+        'c': nodes * (nodes - 1),
+        'y': nodes / df['ns/day'],
+    }
+    products = {
+        a + b: terms[a] * terms[b]
+        for a in 'abc' for b in 'abcy'
+    }
+    keys = [df[column] for column in group_columns(df)]
+    sums = pd.DataFrame(products).groupby(keys, observed=True).sum()
+    sums['n'] = df['nodes'].groupby(keys, observed=True).nunique()
+
+    amdahl_fit = _least_squares(sums, ['a', 'b'])
+    usl_fit = _least_squares(sums, ['a', 'b', 'c'])
+
+    fits = pd.DataFrame(index=sums.index, columns=FIT_COLUMNS, dtype='float64')
+    fits['amdahl ns/day'] = 1 / amdahl_fit[:, 0]
+    fits['serial fraction'] = amdahl_fit[:, 1] / amdahl_fit[:, 0]
+    fits['usl ns/day'] = 1 / usl_fit[:, 0]
+    fits['contention'] = usl_fit[:, 1] / usl_fit[:, 0]
+    fits['coherency'] = usl_fit[:, 2] / usl_fit[:, 0]
+    coherency = fits['coherency'].where(fits['coherency'] > 0)
+    fits['peak nodes'] = np.sqrt((1 - fits['contention']) / coherency)
+    return fits
+
+
+def recommend_nodes(df, min_efficiency=0.75):
+    """Recommend the number of nodes of each group of benchmarks.
+
+    The recommended number of nodes is the largest one up to which the
+    parallel efficiency stays at or above `min_efficiency`. Larger numbers of
+    nodes are not recommended once the efficiency dropped below it, even if
+    it recovers. The cheapest number of nodes has
+    the lowest cost in core-hours per simulated nanosecond.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Results of the analysis, including the `SCALING_COLUMNS`.
+    min_efficiency : float
+        Lowest acceptable parallel efficiency.
+
+    Returns
+    -------
+    pandas.DataFrame
+        `RECOMMEND_COLUMNS` of each group, indexed by the `group_columns`.
+        Groups without a suitable benchmark have NaN values.
+    """
+    columns = group_columns(df)
+    keys = [df[column] for column in columns]
+    groups = df.groupby(keys, observed=True)['nodes'].size().index
+    recommendations = pd.DataFrame(
+        index=groups, columns=RECOMMEND_COLUMNS, dtype='float64')
+
+    # Stop at the first number of nodes that falls below the threshold.
+    # Benchmarks without results do not count.
+    ordered = df.dropna(subset=['efficiency']).sort_values('nodes')
+    below = (ordered['efficiency'] < min_efficiency).astype(int).groupby(
+        [ordered[column] for column in columns], observed=True).cumsum()
+    efficient = ordered[below == 0]
+    best = efficient.loc[efficient.groupby(
+        columns, observed=True)['nodes'].idxmax()].set_index(columns)
+    recommendations.loc[best.index, ['nodes', 'ns/day', 'efficiency']] = \
+        best[['nodes', 'ns/day', 'efficiency']].values
+
+    priced = df.dropna(subset=['core-hours/ns'])
+    cheapest = priced.loc[priced.groupby(
+        columns, observed=True)['core-hours/ns'].idxmin()].set_index(columns)
+    recommendations.loc[cheapest.index,
+                        ['cheapest nodes', 'cheapest ns/day',
+                         'core-hours/ns']] = cheapest[[
+                             'nodes', 'ns/day', 'core-hours/ns'
+                         ]].values
+
+    recommendations['nodes'] = recommendations['nodes'].astype('Int64')
+    recommendations['cheapest nodes'] = recommendations[
+        'cheapest nodes'].astype('Int64')
+    return recommendations
+
+
+def format_table(df, columns=None, decimals=None):
+    """Return the printable table of the results.
+
+    By default only the `COLUMNS`, `SWEEP_COLUMNS` and `SCALING_COLUMNS` are
+    shown, additional columns are only written to the output files. Columns are rounded to the
+    number of `decimals`, which default to `PRINT_DECIMALS`. NaN values are
+    replaced by question marks.
+    """
+    if columns is None:
+        columns = COLUMNS + [c for c in SWEEP_COLUMNS if c in df
+                             ] + SCALING_COLUMNS
+    if decimals is None:
+        decimals = PRINT_DECIMALS
+    df = df[columns].round(decimals)
+    # The columns are formatted before NaN is replaced, otherwise their values
+    # would be printed with different numbers of decimals. Other columns keep
+    # their type if nothing is missing, so pandas aligns them as numbers.
+    for name in df:
+        if name in decimals:
+            # Small negative numbers are rounded to -0.0
+            df[name] = [
+                '?' if pd.isnull(value) else '{:.{}f}'.format(
+                    value + 0., decimals[name]) for value in df[name]
+            ]
+        elif df[name].isnull().any():
+            df[name] = ['?' if pd.isnull(value) else str(value)
+                        for value in df[name]]
+    return df.to_string()
+
+
+def sort_results(df):
+    """Sort the results by host, module and settings of the benchmarks."""
+    sweeps = [c for c in SWEEP_COLUMNS if c in df]
+    return df.sort_values(['host', 'module', 'run time [min]', 'gpu'] +
+                          sweeps + ['nodes']).reset_index(drop=True)
+
+
+def watch_benchmarks(bundle, df, interval, jobs=1, cache=None,
+                     baseline_nodes=None, ncores=None):
+    """Show the results of running benchmarks until interrupted with Ctrl-C.
+
+    The benchmarks are analyzed again every `interval` seconds. Only log
+    files that changed since the last analysis are parsed and the table is
+    only redrawn when the results changed.
+
+    Parameters
+    ----------
+    bundle : list of Benchmark
+        Benchmarks to watch. New benchmarks are not discovered.
+    df : pandas.DataFrame
+        Results of the initial analysis of `bundle`. They are shown first.
+    interval : float
+        Seconds to wait between two analyses.
+    jobs : int
+        Number of benchmarks to analyze concurrently.
+    cache : AnalyzeCache
+        Cache of already parsed log files. If not given, a cache is kept in
+        memory.
+    baseline_nodes, ncores : int
+        Passed to `calc_scaling`.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Sorted results of the last complete analysis.
+    """
+    if cache is None:
+        cache = AnalyzeCache()
+
+    df = sort_results(df)
+    table = None
+    try:
+        while True:
+            new_table = format_table(
+                calc_scaling(df, baseline_nodes=baseline_nodes, ncores=ncores))
+            if new_table != table:
+                table = new_table
+                click.clear()
+                console.info(
+                    'Watching {} benchmarks, updated at {}. Press Ctrl-C to '
+                    'stop.', len(bundle), time.strftime('%H:%M:%S'))
+                print(table)
+            time.sleep(interval)
+            df = sort_results(
+                build_dataframe(analyze_bundle(bundle, jobs=jobs,
+                                               cache=cache)))
+    except KeyboardInterrupt:
+        pass
+
+    return df
+
+
+def write_csv(df, output_name=None):
+    """Write the results of the analysis to a CSV file.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Results of the analysis.
+    output_name : str
+        Name of the CSV file. The extension `.csv` is appended if missing. If
+        not given, the name is generated from the current date and time.
+    """
+    # here we determine which output name to use.
+    if output_name is None:
+        output_name = generate_output_name("csv")
+    if '.csv' not in output_name:
+        output_name = '{}.csv'.format(output_name)
+    df.to_csv(output_name)
 
 
 @cli.command()
@@ -126,6 +698,25 @@ def plot_analysis(df, ncores):
     '--plot',
     is_flag=True,
     help='Generate a plot of finished benchmarks.')
+@click.option(
+    '--facet',
+    'facets',
+    type=click.Choice(GROUP_COLUMNS + SWEEP_COLUMNS),
+    multiple=True,
+    help='Draw a separate plot for every host, module, gpu or swept setting. '
+    'Can be given multiple times. All other benchmarks are drawn into the '
+    'same plot.')
+@click.option(
+    '--plot-format',
+    type=click.Choice(PLOT_FORMATS),
+    default='pdf',
+    help='File format of the plot.',
+    show_default=True)
+@click.option(
+    '--plot-name',
+    default='runtimes',
+    help='Name of the plot file.',
+    show_default=True)
 @click.option(
     '--ncores',
     type=int,
@@ -133,63 +724,151 @@ def plot_analysis(df, ncores):
     help='Number of cores per node. If not given it will be parsed from the '
     'benchmarks log file.',
     show_default=True)
+@click.option(
+    '--baseline-nodes',
+    type=click.IntRange(1, None),
+    default=None,
+    help='Number of nodes of the reference benchmark for the speedup and '
+    'parallel efficiency. Defaults to the smallest number of nodes of each '
+    'module and host.')
+@click.option(
+    '--recommend',
+    is_flag=True,
+    help='Recommend the number of nodes of each module and host.')
+@click.option(
+    '--min-efficiency',
+    type=float,
+    default=0.75,
+    help='Lowest parallel efficiency of the recommended number of nodes.',
+    show_default=True)
 @click.option(
     '-o', '--output-name', default=None, help="Name of the output .csv file.", type=str)
-def analyze(directory, plot, ncores, output_name):
+@click.option(
+    '--csv/--no-csv',
+    default=True,
+    help='Write the results to a .csv file.',
+    show_default=True)
+@click.option(
+    '--store',
+    type=click.Path(dir_okay=False),
+    default=None,
+    help='Append the results to a Parquet (.parquet), Feather (.feather) or '
+    'SQLite (.db, .sqlite) result store. Benchmarks that are already in the '
+    'store are replaced.')
+@click.option(
+    '-j',
+    '--jobs',
+    help='Number of benchmarks to analyze in parallel.',
+    default=1,
+    show_default=True,
+    type=click.IntRange(1, None))
+@click.option(
+    '-w',
+    '--watch',
+    is_flag=True,
+    help='Keep showing the results of running benchmarks and update them '
+    'when log files change. Stop with Ctrl-C.')
+@click.option(
+    '--interval',
+    type=float,
+    default=10,
+    help='Seconds between two updates in watch mode.',
+    show_default=True)
+@click.option(
+    '--cache',
+    'use_cache',
+    is_flag=True,
+    help='Cache the parsed log files inside the benchmark directory. Only new '
+    'or modified log files are parsed again.')
+@click.option(
+    '--index',
+    is_flag=True,
+    help='Store the discovered benchmarks in an index to speed up later runs.')
+def analyze(directory, plot, facets, plot_format, plot_name, ncores,
+            baseline_nodes, recommend, min_efficiency, output_name, csv, store,
+            jobs, watch, interval, use_cache, index):
     """Analyze finished benchmarks."""
-    bundle = mds.discover(directory)
+    if not 0 < min_efficiency <= 1:
+        console.error('The parallel efficiency must be larger than 0 and at '
+                      'most 1.')
+
+    if store is not None:
+        # Fail early on unknown formats of the result store.
+        store_format(store)
+
+    bundle = discover(directory, index=index)
+
+    if watch and interval <= 0:
+        console.error('The interval must be larger than 0 seconds.')
 
-    df = pd.DataFrame(columns=[
-        'module', 'nodes', 'ns/day', 'run time [min]', 'gpu', 'host', 'ncores'
-    ])
+    # In watch mode, unchanged log files are not parsed again, even if the
+    # cache is not stored.
+    cache = None
+    if use_cache:
+        cache = AnalyzeCache(directory)
+    elif watch:
+        cache = AnalyzeCache()
 
-    for i, sim in enumerate(bundle):
-        # older versions wrote a version category. This ensures backwards compatibility
-        if 'module' in sim.categories:
-            module = sim.categories['module']
-        else:
-            module = sim.categories['version']
-        # call the engine specific analysis functions
-        df.loc[i] = detect_md_engine(module).analyze_run(sim)
+    df = build_dataframe(analyze_bundle(bundle, jobs=jobs, cache=cache))
 
     if df.empty:
         console.error('There is no data for the given path.')
 
-    if df.isnull().values.any():
+    if watch:
+        df = watch_benchmarks(
+            bundle,
+            df,
+            interval,
+            jobs=jobs,
+            cache=cache,
+            baseline_nodes=baseline_nodes,
+            ncores=ncores)
+
+    if cache is not None:
+        cache.save()
+
+    if df[COLUMNS].isnull().values.any():
         console.warn(
             'We were not able to gather informations for all systems. '
             'Systems marked with question marks have either crashed or '
             'were not started yet.')
 
-    # Sort values by `nodes`
-    df = df.sort_values(['host', 'module', 'run time [min]', 'gpu',
-                         'nodes']).reset_index(drop=True)
+    df = sort_results(df)
 
-    # Reformat NaN values nicely into question marks.
-    df_to_print = df.replace(np.nan, '?')
-    print(df_to_print)
+    # The scaling columns depend on the other benchmarks of the analysis, so
+    # they are not stored. They can be calculated again from the store.
+    if store is not None:
+        write_store(df, store)
 
-    # here we determine which output name to use.
-    if output_name is None:
-        output_name = generate_output_name("csv")
-    if '.csv' not in output_name:
-        output_name = '{}.csv'.format(output_name)
-    df.to_csv(output_name)
+    df = calc_scaling(df, baseline_nodes=baseline_nodes, ncores=ncores)
+
+    print(format_table(df))
+
+    fits = fit_scaling(df)
+    if fits['serial fraction'].notnull().any():
+        console.info('Scaling models fitted to the benchmarks:')
+        print(format_table(fits.reset_index(),
+                           group_columns(df) + FIT_COLUMNS))
+
+    if recommend:
+        recommendations = recommend_nodes(df, min_efficiency=min_efficiency)
+        console.info('Recommended number of nodes with a parallel efficiency '
+                     'of at least {:.0%}:'.format(min_efficiency))
+        print(format_table(recommendations.reset_index(),
+                           group_columns(df) + RECOMMEND_COLUMNS))
+
+    if csv:
+        write_csv(df, output_name)
 
     if plot:
-        df = pd.read_csv(output_name)
-
-        # We only support plotting of benchmark systems from equal hosts /
-        # with equal settings
-        uniqueness = df.apply(lambda x: x.nunique())
-        if uniqueness['gromacs'] > 1 or uniqueness['host'] > 1:
-            console.error(
-                'Cannot plot benchmarks for more than one GROMACS module '
-                'and/or host.')
-
-        # Fail if we have no values at all. This should be some edge case when
-        # a user fumbles around with the datreant categories
-        if df['gpu'].empty and df[~df['gpu']].empty:
+        # Fail if we have no values at all, e.g., if no benchmark has finished
+        # yet.
+        if df['ns/day'].isnull().all():
             console.error('There is no data to plot.')
 
-        plot_analysis(df, ncores)
+        plot_analysis(
+            df,
+            ncores=ncores,
+            facets=facets,
+            output_name=plot_name,
+            output_format=plot_format)
@@ -0,0 +1,111 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017 Max Linke & Michael Gecht and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import json
+import os
+
+from . import console
+
+CACHE_FILENAME = '.mdbenchmark_cache.json'
+
+
+class AnalyzeCache(object):
+    """Persistent cache of parsed benchmark log files.
+
+    The parsed values of each benchmark are stored together with the path,
+    modification time and size of its log file, as well as the version of
+    the parser of the MD engine. A log file is only parsed again, if any of
+    these changed.
+
+    Parameters
+    ----------
+    directory : str
+        Directory of the benchmark campaign. The cache is stored inside it.
+        If not given, the cache is only kept in memory.
+    """
+
+    def __init__(self, directory=None):
+        self.filename = None
+        self.entries = {}
+        self.modified = False
+
+        if directory is not None:
+            self.filename = os.path.join(directory, CACHE_FILENAME)
+
+        if self.filename is not None and os.path.exists(self.filename):
+            try:
+                with open(self.filename) as fh:
+                    self.entries = json.load(fh)
+            except (IOError, ValueError):
+                console.warn('Could not read analyze cache {}. Ignoring it.',
+                             self.filename)
+
+    @staticmethod
+    def _key(output_file, engine):
+        stat = os.stat(output_file)
+        return {
+            'path': os.path.abspath(output_file),
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+            'parser': '{}:{}'.format(engine.__name__, engine.PARSER_VERSION),
+        }
+
+    def parse(self, sim, engine):
+        """Return the parsed log file of `sim`.
+
+        Parameters
+        ----------
+        sim : Sim
+            Benchmark to analyze.
+        engine : module
+            MD engine module of the benchmark.
+
+        Returns
+        -------
+        dict
+            Parsed values, as returned by `engine.parse_output_file`. Empty,
+            if the benchmark did not write a log file (yet).
+        """
+        output_file = engine.find_output_file(sim)
+        if output_file is None:
+            return {}
+
+        key = self._key(output_file, engine)
+        entry = self.entries.get(sim.uuid)
+        if entry is not None and entry['key'] == key:
+            return entry['values']
+
+        values = engine.parse_output_file(output_file)
+        self.entries[sim.uuid] = {'key': key, 'values': values}
+        self.modified = True
+
+        return values
+
+    def save(self):
+        """Write the cache to disk, if it changed."""
+        if self.filename is None or not self.modified:
+            return
+
+        # Write to a temporary file first, so that an interrupted analysis
+        # does not leave a corrupt cache behind.
+        tmp_filename = '{}.tmp'.format(self.filename)
+        with open(tmp_filename, 'w') as fh:
+            json.dump(self.entries, fh)
+        os.rename(tmp_filename, self.filename)
+        self.modified = False
@@ -0,0 +1,184 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017 Max Linke & Michael Gecht and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import sys
+
+import click
+import numpy as np
+import pandas as pd
+
+from . import console
+from .analyze import (DTYPES, SWEEP_COLUMNS, SWEEP_DEFAULTS, analyze_bundle,
+                      build_dataframe, format_table)
+from .cli import cli
+from .discover import discover
+from .store import read_store
+
+# Benchmarks with equal values of these columns, and of the `SWEEP_COLUMNS`
+# if the benchmarks have any, are compared with each other.
+COMPARE_COLUMNS = ['host', 'family', 'nodes', 'gpu']
+RESULT_COLUMNS = [
+    'baseline ns/day', 'ns/day', 'change [%]', 'z', 'regression'
+]
+
+PRINT_DECIMALS = {
+    'baseline ns/day': 3,
+    'ns/day': 3,
+    'change [%]': 1,
+    'z': 2,
+}
+
+
+def module_family(module):
+    """Return the module without minor version, e.g. `gromacs/2018`.
+
+    Rebuilds and patch releases of a module belong to the same family.
+    """
+    name, _, version = module.partition('/')
+    if not version:
+        return name
+    return '{}/{}'.format(name, version.split('.')[0].split('-')[0])
+
+
+def read_results(filename):
+    """Read the results of an earlier analysis from a CSV file or store."""
+    if filename.lower().endswith('.csv'):
+        df = pd.read_csv(filename, index_col=0)
+        for name, dtype in DTYPES.items():
+            if name in df:
+                df[name] = df[name].astype(dtype)
+        return df
+    return read_store(filename, dtypes=DTYPES)
+
+
+def _statistics(df, sweeps=()):
+    """Mean, variance and number of samples of the performance per group."""
+    df = df.dropna(subset=['ns/day'])
+    keys = [df['host'].astype(str), df['module'].astype(str).map(
+        module_family).rename('family'), df['nodes'], df['gpu']]
+    # Benchmarks without a swept setting use the defaults.
+    for name in sweeps:
+        default = SWEEP_DEFAULTS[name]
+        if name in df:
+            keys.append(df[name].fillna(default).astype(type(default)))
+        else:
+            keys.append(pd.Series(default, index=df.index, name=name))
+    return df.groupby(keys)['ns/day'].agg(['mean', 'var', 'count'])
+
+
+def compare_results(baseline, current, tolerance=0.05, sigma=2.):
+    """Compare the performance of benchmarks to a baseline.
+
+    A group of benchmarks is a regression if its mean performance is more
+    than `tolerance` slower than the baseline. If both the baseline and the
+    current results contain repeated benchmarks, the slowdown must also be
+    larger than `sigma` times its standard error to be significant.
+
+    Parameters
+    ----------
+    baseline, current : pandas.DataFrame
+        Results of the analysis.
+    tolerance : float
+        Accepted relative slowdown.
+    sigma : float
+        Number of standard errors of a significant slowdown.
+
+    Returns
+    -------
+    pandas.DataFrame
+        `COMPARE_COLUMNS`, the `SWEEP_COLUMNS` found in either results and
+        the `RESULT_COLUMNS` of all groups that are in the baseline and the
+        current results.
+    """
+    sweeps = [c for c in SWEEP_COLUMNS if c in baseline or c in current]
+    stats = _statistics(baseline, sweeps).join(
+        _statistics(current, sweeps), how='inner', lsuffix=' baseline')
+
+    change = stats['mean'] / stats['mean baseline'] - 1
+    stderr = np.sqrt(stats['var baseline'] / stats['count baseline'] +
+                     stats['var'] / stats['count'])
+    # Groups without repeated benchmarks have no standard error.
+    z = (stats['mean'] - stats['mean baseline']) / stderr.where(stderr > 0)
+
+    df = pd.DataFrame({
+        'baseline ns/day': stats['mean baseline'],
+        'ns/day': stats['mean'],
+        'change [%]': 100 * change,
+        'z': z,
+        'regression': (change < -tolerance) & ~(z >= -sigma),
+    })
+    return df[RESULT_COLUMNS].reset_index()
+
+
+@cli.command()
+@click.argument('baseline', type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    '-d',
+    '--directory',
+    help='Path in which to look for benchmarks.',
+    default='.',
+    show_default=True)
+@click.option(
+    '--results',
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help='Compare the results in this .csv file or store instead of the '
+    'benchmarks in the directory.')
+@click.option(
+    '--tolerance',
+    type=float,
+    default=0.05,
+    help='Accepted relative slowdown.',
+    show_default=True)
+@click.option(
+    '--sigma',
+    type=float,
+    default=2.,
+    help='Number of standard errors that a slowdown of repeated benchmarks '
+    'must exceed to count as regression.',
+    show_default=True)
+def compare(baseline, directory, results, tolerance, sigma):
+    """Compare benchmarks to a baseline.
+
+    The BASELINE is a .csv file written by `mdbenchmark analyze` or a result
+    store. Benchmarks are compared per host, module family (e.g.
+    gromacs/2018), number of nodes and GPU usage. Exits with status 1 if the
+    benchmarks are slower than the baseline.
+    """
+    if results is not None:
+        current = read_results(results)
+    else:
+        current = build_dataframe(analyze_bundle(discover(directory)))
+
+    df = compare_results(
+        read_results(baseline), current, tolerance=tolerance, sigma=sigma)
+    if df.empty:
+        console.error('There are no finished benchmarks to compare with the '
+                      'baseline.')
+
+    columns = [c for c in COMPARE_COLUMNS + SWEEP_COLUMNS if c in df]
+    print(format_table(df, columns + RESULT_COLUMNS, PRINT_DECIMALS))
+
+    # Regressions are an expected outcome of the comparison and not an error,
+    # but the exit status still tells scripts about them.
+    regressions = int(df['regression'].sum())
+    if regressions:
+        console.warn('Found {} performance regressions.', regressions)
+        sys.exit(1)
+    console.info('No performance regressions found.')
@@ -0,0 +1,224 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017 Max Linke & Michael Gecht and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import hashlib
+import json
+import os
+import re
+
+import xdg
+
+from . import console
+
+try:
+    from os import scandir
+except ImportError:
+    # Python 2. `scandir` is a dependency of datreant.
+    from scandir import scandir
+
+# The index is not stored inside the benchmark directory, because writing it
+# would change the modification time of the directory and invalidate it.
+INDEX_DIRECTORY = os.path.join(xdg.XDG_CACHE_HOME, 'MDBenchmark')
+INDEX_VERSION = 1
+
+# State files written by `mds.Sim`
+STATE_FILE = re.compile(r'^Sim\.([0-9a-f-]+)\.json$')
+
+
+class Benchmark(object):
+    """Lightweight stand-in for the Sim of a benchmark.
+
+    Only the location and the categories of the Sim are read from its state
+    file. Use `mds.Sim(benchmark.abspath)` to make persistent changes.
+    """
+
+    def __init__(self, state_file, categories):
+        self.state_file = state_file
+        self.uuid = STATE_FILE.match(os.path.basename(state_file)).group(1)
+        # Like datreant, we use a trailing slash for directories.
+        self.abspath = os.path.join(
+            os.path.dirname(os.path.abspath(state_file)), '')
+        self.categories = categories
+
+    @property
+    def relpath(self):
+        return os.path.join(os.path.relpath(self.abspath), '')
+
+    def __repr__(self):
+        return "<Benchmark: '{}'>".format(self.relpath)
+
+
+def _read_categories(state_file):
+    with open(state_file) as fh:
+        return json.load(fh).get('categories', {})
+
+
+def _scan(directory):
+    """Find the state files of all benchmarks below `directory`.
+
+    Directories containing a state file are benchmarks and are not descended
+    into, neither are hidden directories.
+
+    Returns
+    -------
+    state_files : list
+        Absolute paths of the state files.
+    directories : dict
+        Modification time of every directory that was searched, keyed by its
+        absolute path.
+    """
+    state_files = []
+    directories = {}
+
+    stack = [os.path.abspath(directory)]
+    while stack:
+        path = stack.pop()
+        directories[path] = os.stat(path).st_mtime
+
+        subdirectories = []
+        state_file = None
+        for entry in scandir(path):
+            if entry.is_dir(follow_symlinks=False):
+                if not entry.name.startswith('.'):
+                    subdirectories.append(entry.path)
+            elif STATE_FILE.match(entry.name):
+                state_file = entry.path
+
+        if state_file is not None:
+            # This directory is a benchmark and we have found what we need.
+            del directories[path]
+            state_files.append(state_file)
+        else:
+            stack.extend(subdirectories)
+
+    return state_files, directories
+
+
+def index_filename(directory):
+    """Return the path of the index file of the benchmarks in `directory`."""
+    path = os.path.abspath(directory).encode('utf-8')
+    return os.path.join(INDEX_DIRECTORY,
+                        'index-{}.json'.format(hashlib.sha1(path).hexdigest()))
+
+
+def _load_index(filename):
+    """Return the benchmarks stored in the index or `None`, if the index is
+    missing or out of date."""
+    try:
+        with open(filename) as fh:
+            index = json.load(fh)
+    except (IOError, OSError, ValueError):
+        return None
+
+    if index.get('version') != INDEX_VERSION:
+        return None
+
+    # New benchmarks change the modification time of their parent directory.
+    for path, mtime in index['directories'].items():
+        try:
+            if os.stat(path).st_mtime != mtime:
+                return None
+        except OSError:
+            return None
+
+    return index
+
+
+def _write_index(filename, directories, entries):
+    index = {
+        'version': INDEX_VERSION,
+        'directories': directories,
+        'benchmarks': entries,
+    }
+    tmp_filename = '{}.tmp'.format(filename)
+    try:
+        if not os.path.isdir(INDEX_DIRECTORY):
+            os.makedirs(INDEX_DIRECTORY)
+        with open(tmp_filename, 'w') as fh:
+            json.dump(index, fh)
+        os.rename(tmp_filename, filename)
+    except (IOError, OSError):
+        console.warn('Could not write the benchmark index {}.', filename)
+
+
+def discover(directory='.', index=False):
+    """Find all benchmarks below `directory`.
+
+    This is a fast replacement for `mds.discover`. Instead of building a Sim
+    for every benchmark, we only walk the directory tree and read the
+    categories from the state files.
+
+    Parameters
+    ----------
+    directory : str
+        Path in which to look for benchmarks.
+    index : bool
+        Store the discovered benchmarks in an index file in the user cache
+        directory. Later calls only read the index, checking the modification times of
+        the state files and the searched directories. Benchmarks whose state
+        file changed are read again. If any directory changed, e.g. because
+        new benchmarks were generated, the directory tree is searched again.
+
+    Returns
+    -------
+    list of Benchmark
+        Benchmarks sorted by their path.
+    """
+    if not os.path.isdir(directory):
+        return []
+
+    filename = index_filename(directory)
+    cached = _load_index(filename) if index else None
+
+    if cached is not None:
+        directories = cached['directories']
+        known = dict((entry['state_file'], entry)
+                     for entry in cached['benchmarks'])
+        state_files = list(known)
+    else:
+        state_files, directories = _scan(directory)
+        known = {}
+
+    benchmarks = []
+    entries = []
+    modified = cached is None
+    for state_file in sorted(state_files):
+        try:
+            mtime = os.stat(state_file).st_mtime
+        except OSError:
+            # The benchmark was removed.
+            modified = True
+            continue
+
+        entry = known.get(state_file)
+        if entry is None or entry['mtime'] != mtime:
+            entry = {
+                'state_file': state_file,
+                'mtime': mtime,
+                'categories': _read_categories(state_file),
+            }
+            modified = True
+
+        entries.append(entry)
+        benchmarks.append(Benchmark(state_file, entry['categories']))
+
+    if index and modified:
+        _write_index(filename, directories, entries)
+
+    return benchmarks
@@ -17,11 +17,19 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import itertools
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
 import click
 import datreant.core as dtr
 
 from . import console, mdengines, utils
 from .cli import cli
+from .staging import STAGING_METHODS, InputStore
 
 
 def validate_name(ctx, param, name=None):
@@ -53,6 +61,116 @@ def validate_number_of_nodes(min_nodes, max_nodes):
             param_hint='"--min-nodes"')
 
 
+def validate_mdrun_flags(sweeps, min_nodes, ranks):
+    """Validate that every combination of the swept mdrun options can be run
+       by GROMACS.
+    """
+    if 'gpu' in sweeps.get('pme', ()) and set(sweeps.get('nb', ())) != {'gpu'}:
+        raise click.BadParameter(
+            'GROMACS can only compute PME on GPUs if the nonbonded '
+            'interactions are computed on GPUs as well. Use only --nb gpu.',
+            param_hint='"--pme"')
+
+    # The number of ranks is unknown if the template decides about it.
+    npme = max(sweeps.get('npme', [0]))
+    if ranks and npme > 0 and npme >= min_nodes * min(ranks):
+        raise click.BadParameter(
+            'The number of separate PME ranks must be smaller than the total '
+            'number of MPI ranks, which is {} for the smallest benchmark.'.
+            format(min_nodes * min(ranks)),
+            param_hint='"--npme"')
+
+
+# GROMACS mdrun options that can be swept and their values.
+MDRUN_FLAGS = OrderedDict([
+    ('npme', click.IntRange(-1, None)),
+    ('nb', click.Choice(['auto', 'cpu', 'gpu'])),
+    ('pme', click.Choice(['auto', 'cpu', 'gpu'])),
+    ('dlb', click.Choice(['auto', 'no', 'yes'])),
+])
+
+
+def benchmark_folder(benchmark):
+    """Return the folder of a benchmark, see `utils.benchmark_folder`."""
+    return utils.benchmark_folder(benchmark['nodes'], benchmark['ranks'],
+                                  benchmark['threads'],
+                                  benchmark.get('mdrun_flags'))
+
+
+def write_benchmark(benchmark):
+    """Write a single benchmark with the engine specific `write_bench`.
+
+    If this fails, the folder of the benchmark is removed again, unless it
+    existed before.
+
+    Returns
+    -------
+    tuple
+        the staging method used for the input files and the error, if any.
+    """
+    engine = mdengines.detect_md_engine(benchmark['module'])
+    folder = os.path.join(benchmark['top'].abspath,
+                          benchmark_folder(benchmark))
+    existed = os.path.exists(folder)
+    try:
+        return engine.write_bench(**benchmark), None
+    except (Exception, SystemExit) as error:
+        if not existed and os.path.exists(folder):
+            shutil.rmtree(folder)
+        return None, error
+
+
+def write_benchmarks(benchmarks, jobs=1):
+    """Write several benchmarks, see `write_benchmark`.
+
+    Parameters
+    ----------
+    benchmarks : list of dict
+        keyword arguments of the engine specific `write_bench` functions.
+    jobs : int
+        Number of benchmarks to write concurrently. Writing the input files
+        and job scripts is bound by file system latency, so we use a pool of
+        threads.
+
+    Returns
+    -------
+    list of tuple
+        Results of `write_benchmark` in the same order as `benchmarks`.
+
+    Raises
+    ------
+    SystemExit
+        If an engine asked to stop, e.g. after printing an error. Benchmarks
+        that were not started yet are not written anymore.
+    """
+    stop = threading.Event()
+
+    def write(benchmark):
+        if stop.is_set():
+            return None, None
+        staged, error = write_benchmark(benchmark)
+        if isinstance(error, SystemExit):
+            stop.set()
+        return staged, error
+
+    if jobs <= 1:
+        results = [write(benchmark) for benchmark in benchmarks]
+    else:
+        pool = ThreadPool(jobs)
+        try:
+            # `map` keeps the order of the input.
+            results = pool.map(write, benchmarks)
+        finally:
+            pool.close()
+            pool.join()
+
+    # Serial and parallel runs stop in the same way.
+    for _, error in results:
+        if isinstance(error, SystemExit):
+            raise error
+    return results
+
+
 def print_known_hosts(ctx, param, value):
     """Callback to print all available hosts to the user."""
     if not value or ctx.resilient_parsing:
@@ -142,8 +260,66 @@ def validate_hosts(ctx, param, host=None):
     help='Skip the validation of module names.',
     default=False,
     is_flag=True)
+@click.option(
+    '--staging',
+    help='How to place the input files into the benchmark folders. Falls '
+    'back to copy if the file system does not support it. Defaults to '
+    'symlink with an input store and copy otherwise.',
+    default=None,
+    type=click.Choice(STAGING_METHODS))
+@click.option(
+    '--input-store',
+    help='Directory of a content-addressed store of input files. Every '
+    'distinct input file is stored once and the benchmarks refer to it.',
+    envvar='MDBENCHMARK_INPUT_STORE',
+    default=None,
+    type=click.Path(file_okay=False))
+@click.option(
+    '-j',
+    '--jobs',
+    help='Number of benchmarks to generate in parallel.',
+    default=1,
+    show_default=True,
+    type=click.IntRange(1, None))
+@click.option(
+    '--ranks',
+    help='Number of MPI ranks per node. Can be given multiple times to sweep '
+    'over them. Defaults to the setting of the job template.',
+    multiple=True,
+    type=click.IntRange(1, None))
+@click.option(
+    '--threads',
+    help='Number of OpenMP threads per MPI rank. Can be given multiple times '
+    'to sweep over them. Defaults to the setting of the job template.',
+    multiple=True,
+    type=click.IntRange(1, None))
+@click.option(
+    '--npme',
+    help='Number of separate PME ranks of GROMACS (mdrun -npme). Can be given '
+    'multiple times to sweep over them.',
+    multiple=True,
+    type=MDRUN_FLAGS['npme'])
+@click.option(
+    '--nb',
+    help='Where GROMACS computes the nonbonded interactions (mdrun -nb). Can '
+    'be given multiple times to sweep over them.',
+    multiple=True,
+    type=MDRUN_FLAGS['nb'])
+@click.option(
+    '--pme',
+    help='Where GROMACS computes the long-range PME interactions (mdrun '
+    '-pme). Can be given multiple times to sweep over them.',
+    multiple=True,
+    type=MDRUN_FLAGS['pme'])
+@click.option(
+    '--dlb',
+    help='Dynamic load balancing of GROMACS (mdrun -dlb). Can be given '
+    'multiple times to sweep over them.',
+    multiple=True,
+    type=MDRUN_FLAGS['dlb'])
 def generate(name, gpu, module, host, min_nodes, max_nodes, time,
-             skip_validation):
+             skip_validation, staging, input_store, jobs, ranks, threads, npme,
+             nb, pme, dlb):
     """Generate benchmarks simulations from the CLI."""
     # Validate the number of nodes
     validate_number_of_nodes(min_nodes=min_nodes, max_nodes=max_nodes)
@@ -163,11 +339,41 @@ def generate(name, gpu, module, host, min_nodes, max_nodes, time,
 
     module = mdengines.normalize_modules(module, skip_validation)
 
+    if input_store is not None:
+        input_store = InputStore(input_store)
+    if staging is None:
+        staging = 'copy' if input_store is None else 'symlink'
+
     # If several modules were given and we only cannot find one of them, we
     # continue.
     if not module:
         console.error('No requested modules available!')
 
+    # Every combination of the swept mdrun options is a separate GROMACS
+    # benchmark.
+    values = (npme, nb, pme, dlb)
+    sweeps = OrderedDict((flag, v) for flag, v in zip(MDRUN_FLAGS, values) if v)
+    mdrun_flags = [
+        OrderedDict(zip(sweeps, combination))
+        for combination in itertools.product(*sweeps.values())
+    ]
+    validate_mdrun_flags(sweeps, min_nodes, ranks)
+    # Otherwise all benchmarks would run with the same options.
+    if (sweeps and 'mdrun_flags' not in utils.template_variables(tmpl) and any(
+            mdengines.detect_md_engine(m) is mdengines.gromacs
+            for m in module)):
+        console.error(
+            'The template {} does not pass the mdrun options to GROMACS. Add '
+            '{} to its mdrun command.', host, '{{ mdrun_flags }}')
+
+    layouts = ((max_nodes + 1 - min_nodes) * len(ranks or [None]) *
+               len(threads or [None]))
+    number_of_benchmarks = sum(
+        layouts * len(mdrun_flags)
+        if mdengines.detect_md_engine(m) is mdengines.gromacs else layouts
+        for m in module)
+
+    benchmarks = []
     for m in module:
         # Here we detect the MD engine (supported: GROMACS and NAMD).
         engine = mdengines.detect_md_engine(m)
@@ -182,23 +388,63 @@ def generate(name, gpu, module, host, min_nodes, max_nodes, time,
         engine.check_input_file_exists(name)
 
         console.info('Creating benchmark system for {}.', m + gpu_string)
-        number_of_benchmarks = (len(module) * (max_nodes + 1 - min_nodes))
         run_time_each = '{} minutes'.format(time)
         console.info(
             'Creating a total of {} benchmarks, with a run time of {} each.',
             number_of_benchmarks, run_time_each)
 
         top = dtr.Tree(directory)
-        for n in range(min_nodes, max_nodes + 1):
-            engine.write_bench(
+        # Create the common parent before the benchmarks are written
+        # concurrently.
+        top.make()
+        flags = [None]
+        if engine is mdengines.gromacs:
+            flags = mdrun_flags
+        elif sweeps:
+            console.warn('The mdrun options are only used for GROMACS '
+                         'benchmarks, not for {}.', m)
+
+        # Every combination of the swept parameters is a separate benchmark.
+        nodes = range(min_nodes, max_nodes + 1)
+        for n, r, t, f in itertools.product(nodes, ranks or [None],
+                                            threads or [None], flags):
+            benchmark = dict(
                 top=top,
                 tmpl=tmpl,
                 nodes=n,
+                ranks=r,
+                threads=t,
                 gpu=gpu,
                 module=m,
                 name=name,
                 host=host,
-                time=time)
+                time=time,
+                staging=staging,
+                input_store=input_store)
+            if f is not None:
+                benchmark['mdrun_flags'] = f
+            benchmarks.append(benchmark)
+
+    results = write_benchmarks(benchmarks, jobs)
+
+    failed = 0
+    warned = False
+    for benchmark, (staged, error) in zip(benchmarks, results):
+        if error is not None:
+            failed += 1
+            console.warn(
+                'Could not generate the benchmark of {} in folder {}: {}',
+                benchmark['module'], benchmark_folder(benchmark), error)
+        # The file system is the same for all benchmarks, so we only warn
+        # once.
+        elif staged != staging and not warned:
+            console.warn('Cannot {} the input files, copying them instead.',
+                         staging)
+            warned = True
+
+    if failed:
+        console.error('Could not generate {} of {} benchmarks.', failed,
+                      len(benchmarks))
 
     # Provide some output for the user
     console.info('Finished generating all benchmarks.\n'
@@ -22,12 +22,97 @@ from __future__ import absolute_import
 import os
 import re
 from glob import glob
-from shutil import copyfile
 
 import mdsynthesis as mds
 import numpy as np
 
 from .. import console
+from ..staging import INPUT_HASH, stage_file
+from ..utils import benchmark_folder
+from .parsing import (LogFormatRegistry, extract_fields, parse_fields,
+                      read_lines, read_lines_backwards)
+
+# Bump this whenever the parsed values change, to invalidate cached results.
+PARSER_VERSION = 5
+
+# `parse_log` only reads the header of a log file forwards, followed by the
+# start of the simulation, and its footer backwards from the end of the file.
+# These limit the number of bytes read in each part, in case a log file is
+# incomplete.
+HEADER_SIZE = 1024 * 1024
+TUNING_SIZE = 256 * 1024
+FOOTER_SIZE = 256 * 1024
+
+
+def _grid(*dimensions):
+    return 'x'.join(dimensions)
+
+
+# Values written in the header of the log file, before the simulation started.
+HEADER_FIELDS = {
+    'ncores': (re.compile(r'Running on \d+ nodes? with total (\d+) cores'),
+               int),
+    'dd grid': (re.compile(r'Domain decomposition grid (\d+) x (\d+) x (\d+)'),
+                _grid),
+    'pme ranks': (re.compile(r'separate PME ranks (\d+)'), int),
+}
+
+# The PME load balancing at the start of the simulation tunes the PME grid and
+# the coulomb cut-off.
+TUNING_END = 'optimal pme grid'
+TUNING_FIELDS = {
+    'pme grid': (re.compile(r'optimal pme grid (\d+) (\d+) (\d+)'), _grid),
+    'rcoulomb': (re.compile(r'optimal pme grid .*coulomb cutoff (\S+)'),
+                 float),
+}
+
+# The footer of the log file starts with the flop accounting, followed by the
+# domain decomposition statistics and the cycle and time accounting table.
+FOOTER_START = 'M E G A - F L O P S   A C C O U N T I N G'
+CYCLE_ACCOUNTING_START = \
+    'R E A L   C Y C L E   A N D   T I M E   A C C O U N T I N G'
+
+# Values written in the footer of the log file, after the simulation finished.
+# The core time is summed over all threads, so their ratio to the wall time
+# is the average number of busy threads, in percent.
+FOOTER_FIELDS = {
+    'ns/day': (re.compile(r'Performance:\s+(\S+)'), float),
+    'hours/ns': (re.compile(r'Performance:\s+\S+\s+(\S+)'), float),
+    'core time [s]': (re.compile(r'Time:\s+(\S+)'), float),
+    'wall time [s]': (re.compile(r'Time:\s+\S+\s+(\S+)'), float),
+    'core/wall [%]': (re.compile(r'Time:\s+\S+\s+\S+\s+(\S+)'), float),
+    'load imbalance [%]': (re.compile(r'Average load imbalance:\s*(\S+?)\s*%'),
+                           float),
+    'load imbalance loss [%]': (re.compile(
+        r'waiting due to load imbalance:\s*(\S+?)\s*%'), float),
+    'pme/pp load': (re.compile(r'Average PME mesh/force load:\s*(\S+)'),
+                    float),
+    'pme/pp imbalance loss [%]': (re.compile(
+        r'waiting due to PP/PME imbalance:\s*(\S+?)\s*%'), float),
+}
+
+# The build information in the header contains the version of GROMACS, e.g.
+# `GROMACS version:    2018.3` or `Gromacs version:    VERSION 4.6.7`.
+VERSION = re.compile(r'GROMACS version:\s+(?:VERSION\s+)?(\S+)', re.IGNORECASE)
+
+# Log formats of the GROMACS versions, keyed by the part of the log file.
+LOG_FORMATS = LogFormatRegistry(VERSION)
+LOG_FORMATS.register({
+    'header': HEADER_FIELDS,
+    'tuning': TUNING_FIELDS,
+    'footer': FOOTER_FIELDS,
+})
+# Before version 5.0, MPI ranks were called nodes.
+LOG_FORMATS.register(
+    {
+        'header':
+        dict(HEADER_FIELDS, **{
+            'pme ranks': (re.compile(r'separate PME nodes (\d+)'), int)
+        }),
+        'tuning': TUNING_FIELDS,
+        'footer': FOOTER_FIELDS,
+    },
+    max_version='5.0')
 
 
 def parse_ns_day(fh):
@@ -43,13 +128,7 @@ def parse_ns_day(fh):
     float / np.nan
         nanoseconds per day or NaN
     """
-    lines = fh.readlines()
-
-    for line in lines:
-        if 'Performance' in line:
-            return float(line.split()[1])
-
-    return np.nan
+    return parse_fields(read_lines(fh), FOOTER_FIELDS)['ns/day']
 
 
 def parse_ncores(fh):
@@ -65,31 +144,172 @@ def parse_ncores(fh):
     int / np.nan
         number of cores job was run on or NaN
     """
-    lines = fh.readlines()
+    return parse_fields(read_lines(fh), HEADER_FIELDS)['ncores']
 
-    for line in lines:
-        if 'Running on' in line:
-            return int(line.split()[6])
 
-    return np.nan
+def _is_number(token):
+    try:
+        float(token)
+    except ValueError:
+        return False
+    return True
+
 
+def parse_cycle_accounting(lines):
+    """parse the share of the wall time spent in each stage of the simulation
+
+    GROMACS breaks down the wall time into stages, like domain decomposition,
+    neighbor search, force and PME mesh calculation, in the table headed by
+    `CYCLE_ACCOUNTING_START`. Each row ends with the percentage of the total
+    time.
+
+    Parameters
+    ----------
+    lines : iterable of str
+        lines of the log file
 
-def analyze_run(sim):
+    Returns
+    -------
+    dict
+        percentage of the wall time keyed by `<stage> [%]`. Empty if the
+        table was not found.
     """
-    Analyze Performance data of a GROMACS simulation.
+    values = {}
+    in_table = False
+    for line in lines:
+        if CYCLE_ACCOUNTING_START in line:
+            in_table = True
+            continue
+        if not in_table:
+            continue
+
+        tokens = line.split()
+        # The sub tables following the total, e.g. the breakdown of the PME
+        # mesh computation, are not of interest.
+        if tokens and tokens[0] == 'Total':
+            break
+
+        numbers = 0
+        while tokens and _is_number(tokens[-1]):
+            tokens.pop()
+            numbers += 1
+
+        # Skip the header, separators and lines like `On 32 MPI ranks`. Every
+        # row has at least the wall time, the cycles and the percentage.
+        if not tokens or numbers < 3:
+            continue
+
+        stage = ' '.join(tokens)
+        values['{} [%]'.format(stage)] = float(line.split()[-1])
+
+    return values
+
+
+def parse_log(fh):
+    """parse all header and footer fields from a GROMACS log file
+
+    We read the header forwards and the footer backwards from the end of the
+    file, so the time needed does not depend on the size of the log file.
+
+    Parameters
+    ----------
+    fh : filehandle
+        log file opened in binary mode
+
+    Returns
+    -------
+    dict
+        the `engine version` and the values of the header, tuning and footer
+        fields of its entry in `LOG_FORMATS`, NaN if they were not found, the
+        CPU efficiency and the cycle accounting of
+        `parse_cycle_accounting`. The CPU efficiency is the core time per
+        wall time and core. It is larger than 1 with hyper-threading and less
+        than 1 if cores were idle.
     """
-    # Set defaults if we are unable to find the information in the log file or
-    # the log file does not exist (yet).
-    ns_day = np.nan
-    ncores = np.nan
+    # The header ends when the simulation is started. It tells us the version
+    # of GROMACS and thereby the format of the log file.
+    header = list(read_lines(fh, stop='Started mdrun', max_size=HEADER_SIZE))
+    version = None
+    for line in header:
+        version = LOG_FORMATS.detect_version(line)
+        if version is not None:
+            break
+    fields = LOG_FORMATS.lookup(version)
+
+    values = {'engine version': np.nan if version is None else version}
+    for part in ('header', 'tuning', 'footer'):
+        values.update((name, np.nan) for name in fields[part])
+
+    values.update(extract_fields(header, fields['header']))
 
+    # The PME tuning, if enabled, finishes shortly after the start.
+    tuning = read_lines(fh, stop=TUNING_END, max_size=TUNING_SIZE)
+    values.update(extract_fields(tuning, fields['tuning']))
+
+    footer = list(
+        read_lines_backwards(fh, stop=FOOTER_START, max_size=FOOTER_SIZE))
+    footer.reverse()
+    values.update(extract_fields(footer, fields['footer']))
+    values.update(parse_cycle_accounting(footer))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values['cpu efficiency'] = np.float64(values['core time [s]']) / (
+            values['wall time [s]'] * values['ncores'])
+
+    return values
+
+
+def find_output_file(sim):
+    """Return the path to the GROMACS log file of a benchmark.
+
+    Returns
+    -------
+    str / None
+        Path to the log file or `None`, if the benchmark did not write one
+        (yet).
+    """
     # search all output files and ignore GROMACS backup files
     output_files = glob(os.path.join(sim.relpath, '[!#]*log*'))
     if output_files:
-        with open(output_files[0]) as fh:
-            ns_day = parse_ns_day(fh)
-            fh.seek(0)
-            ncores = parse_ncores(fh)
+        return output_files[0]
+
+    return None
+
+
+def parse_output_file(filename):
+    """Parse the performance data from a GROMACS log file.
+
+    Parameters
+    ----------
+    filename : str
+        Path to the log file.
+
+    Returns
+    -------
+    dict
+        Parsed values, keyed by the column name used by `analyze`.
+    """
+    with open(filename, 'rb') as fh:
+        return parse_log(fh)
+
+
+def analyze_run(sim, values=None):
+    """
+    Analyze Performance data of a GROMACS simulation.
+
+    `values` can hold the already parsed log file of the benchmark, i.e., the
+    output of `parse_output_file`. Otherwise the log file is parsed here.
+    """
+    if values is None:
+        values = {}
+        output_file = find_output_file(sim)
+        if output_file is not None:
+            values = parse_output_file(output_file)
+
+    # Set defaults if we are unable to find the information in the log file or
+    # the log file does not exist (yet).
+    ns_day = values.get('ns/day', np.nan)
+    ncores = values.get('ncores', np.nan)
 
     # Backward compatibility to previously created benchmark systems
     if 'time' not in sim.categories:
@@ -105,11 +325,25 @@ def analyze_run(sim):
             sim.categories['gpu'], sim.categories['host'], ncores)
 
 
-def write_bench(top, tmpl, nodes, gpu, module, name, host, time):
+def write_bench(top, tmpl, nodes, gpu, module, name, host, time,
+                staging='copy', input_store=None, ranks=None, threads=None,
+                mdrun_flags=None):
     """Generates a single job file for GROMACS and the respective Sim object.
+
+    If an `input_store` is given, the TPR file is staged from the store and
+    its hash is recorded in the categories of the Sim.
+
+    The MPI `ranks` per node and OpenMP `threads` per rank of a parameter
+    sweep are recorded in the categories and passed to the job template. The
+    same holds for the `mdrun_flags`, a dict of mdrun options without the
+    leading dash and their values, e.g. `{'npme': 4}`.
+
+    Returns the method used to stage the TPR file, see
+    `mdbenchmark.staging.stage_file`.
     """
     sim = mds.Sim(
-        top['{}/'.format(nodes)],
+        top['{}/'.format(
+            benchmark_folder(nodes, ranks, threads, mdrun_flags))],
         categories={
             'module': module,
             'gpu': gpu,
@@ -119,13 +353,27 @@ def write_bench(top, tmpl, nodes, gpu, module, name, host, time):
             'name': name,
             'started': False
         })
+    # The layout of the MPI ranks and OpenMP threads is only recorded, if it
+    # is swept. Otherwise the job template decides.
+    if ranks is not None:
+        sim.categories['ranks'] = ranks
+    if threads is not None:
+        sim.categories['threads'] = threads
+    mdrun_flags = mdrun_flags or {}
+    for flag, value in mdrun_flags.items():
+        sim.categories[flag] = value
 
     full_filename = name + '.tpr'
     if name.endswith('.tpr'):
         full_filename = name
         name = name[:-4]
 
-    copyfile(full_filename, sim[full_filename].relpath)
+    source = full_filename
+    if input_store is not None:
+        source, digest = input_store.add(full_filename)
+        sim.categories[INPUT_HASH] = digest
+
+    staged = stage_file(source, sim[full_filename].relpath, staging)
     # Add some time buffer to the requested time. Otherwise the queuing system
     # kills the jobs before GROMACS can finish
     formatted_time = '{:02d}:{:02d}:00'.format(*divmod(time + 5, 60))
@@ -138,12 +386,18 @@ def write_bench(top, tmpl, nodes, gpu, module, name, host, time):
         module=module,
         mdengine=md_engine,
         n_nodes=nodes,
+        ranks=ranks,
+        threads=threads,
+        mdrun_flags=' '.join('-{} {}'.format(flag, value)
+                             for flag, value in mdrun_flags.items()),
         time=time,
         formatted_time=formatted_time)
 
     with open(sim['bench.job'].relpath, 'w') as fh:
         fh.write(script)
 
+    return staged
+
 
 def check_input_file_exists(name):
     """Check if the TPR file exists.
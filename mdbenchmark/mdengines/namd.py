@@ -20,12 +20,111 @@
 import os
 import re
 from glob import glob
-from shutil import copyfile
 
 import mdsynthesis as mds
 import numpy as np
 
 from .. import console
+from ..staging import INPUT_HASH, combine_hashes, stage_file
+from ..utils import benchmark_folder
+from .parsing import LogFormatRegistry, read_lines
+
+# Bump this whenever the parsed values change, to invalidate cached results.
+PARSER_VERSION = 4
+
+# NAMD prints the time step in fs in the header of the output file.
+TIMESTEP = re.compile(r'Info: TIMESTEP\s+(\S+)')
+
+# NAMD prints several benchmark measurements during the first steps of a
+# simulation.
+BENCHMARK_TIME = re.compile(
+    r'Benchmark time: (\d+) CPUs (\S+) s/step (\S+) days/ns')
+
+# NAMD prints its version at the start of the output file, e.g.
+# `Info: NAMD 2.12 for Linux-x86_64-MPI`.
+VERSION = re.compile(r'Info: NAMD (\S+) for')
+
+# Log formats of the NAMD versions. All supported versions write the same
+# lines. Versions that change their wording register their patterns here.
+LOG_FORMATS = LogFormatRegistry(VERSION)
+LOG_FORMATS.register({'timestep': TIMESTEP, 'benchmark': BENCHMARK_TIME})
+
+
+def parse_log(lines):
+    """parse the performance from all benchmark measurements in a NAMD log file
+
+    NAMD measures the performance several times. The first measurement is
+    taken right after the initial load balancing and is the noisiest one, so
+    we drop it if there are more. The performance is calculated from the
+    seconds per step and the time step of the simulation. If the time step
+    was not found, we use the days per ns reported by NAMD.
+
+    Parameters
+    ----------
+    lines : iterable of str
+        lines of the log file
+
+    Returns
+    -------
+    dict
+        mean nanoseconds per day (`ns/day`), its standard deviation
+        (`ns/day std`), the number of measurements used (`ns/day samples`),
+        the number of cores (`ncores`) and the version of NAMD
+        (`engine version`). NaN if they were not found.
+    """
+    version = None
+    patterns = LOG_FORMATS.lookup()
+    timestep = np.nan
+    ncores = np.nan
+    samples = []
+
+    for line in lines:
+        # The version is printed before any other field we are interested in.
+        if version is None:
+            version = LOG_FORMATS.detect_version(line)
+            if version is not None:
+                patterns = LOG_FORMATS.lookup(version)
+                continue
+
+        match = patterns['benchmark'].search(line)
+        if match is not None:
+            cores, seconds_step, days_ns = match.groups()
+            if not samples:
+                ncores = int(cores)
+            samples.append((float(seconds_step), float(days_ns)))
+            continue
+
+        match = patterns['timestep'].search(line)
+        if match is not None:
+            timestep = float(match.group(1))
+
+    values = {
+        'ns/day': np.nan,
+        'ns/day std': np.nan,
+        'ns/day samples': np.nan,
+        'ncores': ncores,
+        'engine version': np.nan if version is None else version
+    }
+    if not samples:
+        return values
+
+    # Skip the first measurement, if we have more.
+    if len(samples) > 1:
+        samples = samples[1:]
+
+    seconds_step, days_ns = np.array(samples).T
+    if np.isnan(timestep):
+        ns_day = 1 / days_ns
+    else:
+        # time step in fs, 86400 seconds per day
+        ns_day = 86400 / seconds_step * timestep * 1e-6
+
+    values['ns/day'] = ns_day.mean()
+    values['ns/day samples'] = len(ns_day)
+    if len(ns_day) > 1:
+        values['ns/day std'] = ns_day.std(ddof=1)
+
+    return values
 
 
 def parse_ns_day(fh):
@@ -41,13 +140,7 @@ def parse_ns_day(fh):
     float
         nanoseconds per day
     """
-    lines = fh.readlines()
-
-    for line in lines:
-        if 'Benchmark time' in line:
-            return 1 / float(line.split()[7])
-
-    return np.nan
+    return parse_log(read_lines(fh))['ns/day']
 
 
 def parse_ncores(fh):
@@ -63,46 +156,84 @@ def parse_ncores(fh):
     float
         number of cores job was run on
     """
-    lines = fh.readlines()
+    return parse_log(read_lines(fh))['ncores']
 
-    for line in lines:
-        if 'Benchmark time' in line:
-            return int(line.split()[3])
-
-    return np.nan
 
+def find_output_file(sim):
+    """Return the path to the NAMD output file of a benchmark.
 
-def analyze_run(sim):
-    """
-    Analyze Performance data of a NAMD simulation
+    Returns
+    -------
+    str / None
+        Path to the output file or `None`, if the benchmark did not write one
+        (yet).
     """
-    ns_day = np.nan
-    ncores = np.nan
-
     # search all output files
     output_files = glob(os.path.join(sim.relpath, '*out*'))
     if output_files:
-        with open(output_files[0]) as fh:
-            ns_day = parse_ns_day(fh)
-            fh.seek(0)
-            ncores = parse_ncores(fh)
+        return output_files[0]
 
-    # module = sim.categories['module']
+    return None
+
+
+def parse_output_file(filename):
+    """Parse the performance data from a NAMD output file.
+
+    Parameters
+    ----------
+    filename : str
+        Path to the output file.
+
+    Returns
+    -------
+    dict
+        Parsed values, keyed by the column name used by `analyze`.
+    """
+    with open(filename) as fh:
+        return parse_log(read_lines(fh))
+
+
+def analyze_run(sim, values=None):
+    """
+    Analyze Performance data of a NAMD simulation
+
+    `values` can hold the already parsed output file of the benchmark, i.e.,
+    the output of `parse_output_file`. Otherwise the output file is parsed
+    here.
+    """
+    if values is None:
+        values = {}
+        output_file = find_output_file(sim)
+        if output_file is not None:
+            values = parse_output_file(output_file)
+
+    ns_day = values.get('ns/day', np.nan)
+    ncores = values.get('ncores', np.nan)
 
     return (sim.categories['module'], sim.categories['nodes'], ns_day,
             sim.categories['time'], sim.categories['gpu'],
             sim.categories['host'], ncores)
 
 
-def write_bench(top, tmpl, nodes, gpu, module, name, host, time):
+def write_bench(top, tmpl, nodes, gpu, module, name, host, time,
+                staging='copy', input_store=None, ranks=None, threads=None):
     """ Writes a single namd benchmark file and the respective sim object
+
+    If an `input_store` is given, the input files are staged from the store
+    and a hash of all of them is recorded in the categories of the Sim.
+
+    The MPI `ranks` per node and OpenMP `threads` per rank of a parameter
+    sweep are recorded in the categories and passed to the job template.
+
+    Returns the method used to stage the input files, see
+    `mdbenchmark.staging.stage_file`.
     """
     # Strip the file extension, if we were given one.
     # This makes the usage of `mdbenchmark generate` equivalent between NAMD and GROMACS.
     if name.endswith('.namd'):
         name = name[:-5]
     sim = mds.Sim(
-        top['{}/'.format(nodes)],
+        top['{}/'.format(benchmark_folder(nodes, ranks, threads))],
         categories={
             'module': module,
             'gpu': gpu,
@@ -112,8 +243,14 @@ def write_bench(top, tmpl, nodes, gpu, module, name, host, time):
             'name': name,
             'started': False
         })
-
-    # Copy input files
+    # The layout of the MPI ranks and OpenMP threads is only recorded, if it
+    # is swept. Otherwise the job template decides.
+    if ranks is not None:
+        sim.categories['ranks'] = ranks
+    if threads is not None:
+        sim.categories['threads'] = threads
+
+    # Stage input files
     namd = '{}.namd'.format(name)
     psf = '{}.psf'.format(name)
     pdb = '{}.pdb'.format(name)
@@ -122,9 +259,15 @@ def write_bench(top, tmpl, nodes, gpu, module, name, host, time):
         analyze_namd_file(fh)
         fh.seek(0)
 
-    copyfile(namd, sim[namd].relpath)
-    copyfile(psf, sim[psf].relpath)
-    copyfile(pdb, sim[pdb].relpath)
+    digests = []
+    for filename in (namd, psf, pdb):
+        source = filename
+        if input_store is not None:
+            source, digest = input_store.add(filename)
+            digests.append(digest)
+        staged = stage_file(source, sim[filename].relpath, staging)
+    if digests:
+        sim.categories[INPUT_HASH] = combine_hashes(digests)
 
     # Add some time buffer to the requested time. Otherwise the queuing system
     # kills the jobs before NAMD can finish
@@ -138,12 +281,16 @@ def write_bench(top, tmpl, nodes, gpu, module, name, host, time):
         module=module,
         mdengine=md_engine,
         n_nodes=nodes,
+        ranks=ranks,
+        threads=threads,
         time=time,
         formatted_time=formatted_time)
 
     with open(sim['bench.job'].relpath, 'w') as fh:
         fh.write(script)
 
+    return staged
+
 
 def analyze_namd_file(fh):
     """ Check whether the NAMD config file has any relative imports or variables
@@ -0,0 +1,241 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017 Max Linke & Michael Gecht and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import re
+
+import numpy as np
+import six
+
+BLOCK_SIZE = 4096
+
+
+def _decode(line):
+    if isinstance(line, six.binary_type):
+        return line.decode('utf-8', 'replace')
+    return line
+
+
+def read_lines(fh, stop=None, max_size=None):
+    """Yield the lines of a file, one at a time.
+
+    Parameters
+    ----------
+    fh : filehandle
+        file opened in text or binary mode
+    stop : str
+        stop after the first line containing this string
+    max_size : int
+        stop after reading this many bytes
+
+    Yields
+    ------
+    str
+        decoded lines
+    """
+    size = 0
+    for line in fh:
+        size += len(line)
+        line = _decode(line)
+        yield line
+        if stop is not None and stop in line:
+            return
+        if max_size is not None and size > max_size:
+            return
+
+
+def read_lines_backwards(fh, stop=None, max_size=None, block_size=BLOCK_SIZE):
+    """Yield the lines of a file in reverse order, starting from the end.
+
+    Parameters
+    ----------
+    fh : filehandle
+        file opened in binary mode
+    stop : str
+        stop after the first line (counted from the end) containing this
+        string
+    max_size : int
+        maximal number of bytes to read from the end of the file
+    block_size : int
+        number of bytes to read at once
+
+    Yields
+    ------
+    str
+        decoded lines without the trailing newline
+    """
+    fh.seek(0, os.SEEK_END)
+    position = fh.tell()
+    start = 0
+    if max_size is not None:
+        start = max(position - max_size, 0)
+
+    remainder = b''
+    while position > start:
+        size = min(block_size, position - start)
+        position -= size
+        fh.seek(position)
+        lines = (fh.read(size) + remainder).split(b'\n')
+        # The first line is only complete once we have read the block before.
+        remainder = lines.pop(0)
+        for line in reversed(lines):
+            line = _decode(line)
+            yield line
+            if stop is not None and stop in line:
+                return
+
+    # We only know that the first line is complete at the start of the file.
+    if position == 0:
+        yield _decode(remainder)
+
+
+def extract_fields(lines, fields):
+    """Extract several fields from the lines of a log file in a single pass.
+
+    Every field is only extracted once. We stop looking for a field as soon
+    as it was found and stop reading lines once all fields were found.
+
+    Parameters
+    ----------
+    lines : iterable of str
+        lines of the log file
+    fields : dict
+        tuples of a compiled regular expression and a converter, keyed by the
+        name of the field. The converter is called with the groups of the
+        first match, e.g. ``(re.compile(r'with total (\\d+) cores'), int)``.
+
+    Yields
+    ------
+    (str, object)
+        name and converted value of each field that was found
+    """
+    remaining = dict(fields)
+    for line in lines:
+        for name, (pattern, converter) in list(remaining.items()):
+            match = pattern.search(line)
+            if match is None:
+                continue
+            del remaining[name]
+            yield name, converter(*match.groups())
+        if not remaining:
+            return
+
+
+def parse_fields(lines, fields):
+    """Extract all `fields` from `lines`.
+
+    Returns
+    -------
+    dict
+        converted values keyed by field name. Fields that were not found are
+        NaN.
+    """
+    values = dict((name, np.nan) for name in fields)
+    values.update(extract_fields(lines, fields))
+    return values
+
+
+def parse_version(version):
+    """Convert a version string to a comparable tuple of integers.
+
+    Only the leading numbers are used, e.g. ``'2018.3'`` is ``(2018, 3)`` and
+    ``'3.0b1'`` is ``(3, 0)``.
+    """
+    match = re.match(r'\d+(?:\.\d+)*', version)
+    if match is None:
+        return ()
+    return tuple(int(part) for part in match.group().split('.'))
+
+
+class LogFormat(object):
+    """Patterns of the log files written by a range of versions of an engine.
+
+    Parameters
+    ----------
+    patterns : dict
+        compiled patterns of the fields of the log file. Their layout is up
+        to the engine.
+    min_version : str
+        first version writing this format. Unbounded if not given.
+    max_version : str
+        first version no longer writing this format. Unbounded if not given.
+    """
+
+    def __init__(self, patterns, min_version=None, max_version=None):
+        self.patterns = patterns
+        self.min_version = min_version
+        self.max_version = max_version
+        self._min = parse_version(min_version) if min_version else None
+        self._max = parse_version(max_version) if max_version else None
+
+    def supports(self, version):
+        """Return whether `version` writes this format."""
+        version = parse_version(version)
+        if self._min is not None and version < self._min:
+            return False
+        if self._max is not None and version >= self._max:
+            return False
+        return True
+
+
+class LogFormatRegistry(object):
+    """Log formats of an MD engine, keyed by the versions writing them.
+
+    Parameters
+    ----------
+    version_pattern : compiled regular expression
+        matches the line of the log file header containing the version of the
+        engine as first group.
+    """
+
+    def __init__(self, version_pattern):
+        self.version_pattern = version_pattern
+        self.formats = []
+
+    def register(self, patterns, min_version=None, max_version=None):
+        """Register the patterns of the log files of a range of versions.
+
+        Formats registered later take precedence, so a format with an
+        unbounded version range should be registered first.
+        """
+        self.formats.append(LogFormat(patterns, min_version, max_version))
+
+    def detect_version(self, line):
+        """Return the version of the engine if `line` contains it, else None."""
+        match = self.version_pattern.search(line)
+        if match is None:
+            return None
+        return match.group(1)
+
+    def lookup(self, version=None):
+        """Return the patterns of the log files written by `version`.
+
+        If the version is unknown or not supported by any format, the latest
+        format without an upper version limit is used, i.e. we assume a recent
+        version of the engine.
+        """
+        if version is not None:
+            for log_format in reversed(self.formats):
+                if log_format.supports(version):
+                    return log_format.patterns
+
+        for log_format in reversed(self.formats):
+            if log_format.max_version is None:
+                return log_format.patterns
+        raise LookupError('No log format without upper version limit.')
@@ -0,0 +1,83 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017 Max Linke & Michael Gecht and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import datetime as dt
+
+import click
+
+from . import console
+from .analyze import COLUMNS, DTYPES, format_table, sort_results, write_csv
+from .cli import cli
+from .store import STORE_DATE, query_store
+
+
+@cli.command()
+@click.argument('store', type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    '--host', multiple=True, help='Only show benchmarks of this host.')
+@click.option(
+    '--module', multiple=True, help='Only show benchmarks of this module.')
+@click.option(
+    '--nodes',
+    type=int,
+    multiple=True,
+    help='Only show benchmarks with this number of nodes.')
+@click.option(
+    '--gpu/--cpu',
+    default=None,
+    help='Only show GPU or CPU benchmarks.')
+@click.option(
+    '--since',
+    default=None,
+    help='Only show benchmarks that were stored on or after this date '
+    '(YYYY-MM-DD).')
+@click.option(
+    '-o',
+    '--output-name',
+    default=None,
+    help='Write the results to this .csv file.')
+def query(store, host, module, nodes, gpu, since, output_name):
+    """Query the results stored by `mdbenchmark analyze --store`.
+
+    Options can be given multiple times to show benchmarks matching any of
+    the values.
+    """
+    if since is not None:
+        try:
+            dt.datetime.strptime(since, '%Y-%m-%d')
+        except ValueError:
+            console.error('Dates must be given as YYYY-MM-DD, not {}.', since)
+
+    df = query_store(
+        store,
+        dtypes=DTYPES,
+        since=since,
+        host=host,
+        module=module,
+        nodes=nodes,
+        gpu=None if gpu is None else [gpu])
+
+    if df.empty:
+        console.error('There are no matching benchmarks in the result store.')
+
+    df = sort_results(df)
+    print(format_table(df, [STORE_DATE] + COLUMNS))
+
+    if output_name is not None:
+        write_csv(df, output_name)
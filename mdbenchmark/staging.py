@@ -0,0 +1,194 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017 Max Linke & Michael Gecht and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import hashlib
+import os
+import threading
+from shutil import copyfile
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+# The ways to place the input files into the benchmark folders. Except for
+# `copy`, none of them duplicates the data of the input files.
+STAGING_METHODS = ['copy', 'hardlink', 'reflink', 'symlink']
+
+# ioctl request to share the data blocks of two files on Linux, i.e.
+# `_IOW(0x94, 9, int)`. Supported by Btrfs, XFS and OCFS2 among others.
+FICLONE = 0x40049409
+
+# Sim category holding the hash of the input files of a benchmark.
+INPUT_HASH = 'input_hash'
+
+# Size of the blocks read while hashing input files.
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def _remove(filename):
+    """Remove a file or link, if it exists.
+
+    Files staged earlier may be links to the input file, so we must never
+    write into them.
+    """
+    if os.path.lexists(filename):
+        os.remove(filename)
+
+
+def _reflink(source, destination):
+    """Create a copy-on-write clone of `source`."""
+    if fcntl is None:
+        raise OSError('Reflinks are not supported on this platform.')
+
+    _remove(destination)
+    with open(source, 'rb') as src, open(destination, 'wb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+
+def _hardlink(source, destination):
+    _remove(destination)
+    os.link(source, destination)
+
+
+def _symlink(source, destination):
+    _remove(destination)
+    os.symlink(os.path.abspath(source), destination)
+
+
+def _copy(source, destination):
+    _remove(destination)
+    copyfile(source, destination)
+
+
+STAGING_FUNCTIONS = {
+    'copy': _copy,
+    'hardlink': _hardlink,
+    'reflink': _reflink,
+    'symlink': _symlink,
+}
+
+
+def stage_file(source, destination, method='copy'):
+    """Place an input file into a benchmark folder.
+
+    If the file system cannot link or clone the file, e.g. because `source`
+    and `destination` are on different file systems, we copy it instead.
+
+    Parameters
+    ----------
+    source : str
+        input file
+    destination : str
+        path of the file in the benchmark folder
+    method : str
+        one of `STAGING_METHODS`
+
+    Returns
+    -------
+    str
+        the staging method that was used in the end
+    """
+    # On Python 2, the ioctl of reflinks raises an IOError, which is not an
+    # OSError there.
+    try:
+        STAGING_FUNCTIONS[method](source, destination)
+    except (IOError, OSError):
+        if method == 'copy':
+            raise
+        method = 'copy'
+        _copy(source, destination)
+
+    return method
+
+
+def hash_file(filename, block_size=HASH_BLOCK_SIZE):
+    """Return the SHA-256 hex digest of a file."""
+    sha = hashlib.sha256()
+    with open(filename, 'rb') as fh:
+        for block in iter(lambda: fh.read(block_size), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def combine_hashes(digests):
+    """Return a single hash for the input files with the given `digests`."""
+    if len(digests) == 1:
+        return digests[0]
+    return hashlib.sha256('\n'.join(digests).encode('ascii')).hexdigest()
+
+
+class InputStore(object):
+    """Content-addressed store of benchmark input files.
+
+    Every distinct input file is stored once, named after the SHA-256 hash of
+    its content. Benchmarks then stage their input files from the store, so
+    regenerating benchmarks from the same input does not use more space and
+    the hash identifies the input of every benchmark.
+
+    Parameters
+    ----------
+    directory : str
+        Directory of the store. It is created if it does not exist.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        # digests of the files added so far, keyed by path, mtime and size, so
+        # we hash every input file only once
+        self._digests = {}
+        # benchmarks may be generated concurrently
+        self._lock = threading.Lock()
+
+    def path(self, digest):
+        """Return the path of the file with the given `digest`."""
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def add(self, filename):
+        """Add a file to the store, if its content is not stored yet.
+
+        Returns
+        -------
+        tuple of str
+            the path of the file in the store and its hash
+        """
+        with self._lock:
+            return self._add(filename)
+
+    def _add(self, filename):
+        stat = os.stat(filename)
+        key = (os.path.abspath(filename), stat.st_mtime, stat.st_size)
+        if key not in self._digests:
+            self._digests[key] = hash_file(filename)
+        digest = self._digests[key]
+
+        path = self.path(digest)
+        if not os.path.exists(path):
+            folder = os.path.dirname(path)
+            if not os.path.isdir(folder):
+                os.makedirs(folder)
+            # Write to a temporary file first, so an interrupted copy never
+            # ends up under the name of the hash.
+            tmp = '{}.{}.tmp'.format(path, os.getpid())
+            stage_file(filename, tmp, 'reflink')
+            # Benchmarks may link to the file, so protect it from changes.
+            os.chmod(tmp, 0o444)
+            os.rename(tmp, path)
+
+        return path, digest
@@ -0,0 +1,343 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017 Max Linke & Michael Gecht and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import datetime as dt
+import os
+import sqlite3
+
+import pandas as pd
+
+from . import console
+
+# File extensions of the supported result stores and their formats.
+STORE_FORMATS = {
+    '.parquet': 'parquet',
+    '.feather': 'feather',
+    '.db': 'sqlite',
+    '.sqlite': 'sqlite',
+}
+
+# Column that identifies a benchmark in the result store.
+STORE_KEY = 'uuid'
+
+# Column with the date at which a benchmark was added to the result store. It
+# is kept when the benchmark is stored again.
+STORE_DATE = 'date'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Table and indexed columns of SQLite result stores.
+SQLITE_TABLE = 'results'
+SQLITE_INDEX = ['host', 'module', 'nodes', 'gpu', STORE_DATE]
+
+
+def store_format(filename):
+    """Return the format of a result store based on its file extension."""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in STORE_FORMATS:
+        console.error(
+            'Unknown format of the result store {}. Use one of the '
+            'extensions {}.', filename, ', '.join(sorted(STORE_FORMATS)))
+    return STORE_FORMATS[extension]
+
+
+def _quote(name):
+    """Quote a column name for SQLite."""
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+def _sqlite_type(dtype):
+    """Return the SQLite type of a column of the given data type."""
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(
+            dtype):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'REAL'
+    return 'TEXT'
+
+
+def _where(filters, since=None):
+    """Return the WHERE clause and its parameters for `query_store`."""
+    conditions = []
+    parameters = []
+    for name, values in sorted(filters.items()):
+        conditions.append('{} IN ({})'.format(
+            _quote(name), ', '.join('?' * len(values))))
+        parameters.extend(values)
+    if since is not None:
+        conditions.append('{} >= ?'.format(_quote(STORE_DATE)))
+        parameters.append(since)
+
+    if not conditions:
+        return '', parameters
+    return ' WHERE {}'.format(' AND '.join(conditions)), parameters
+
+
+def _read_sqlite(filename, columns=None, filters=None, since=None):
+    where, parameters = _where(filters or {}, since)
+
+    connection = sqlite3.connect(filename)
+    try:
+        if columns is None:
+            columns = [
+                row[1] for row in connection.execute(
+                    'PRAGMA table_info({})'.format(SQLITE_TABLE))
+            ]
+        df = pd.read_sql_query(
+            'SELECT {} FROM {}{}'.format(
+                ', '.join(_quote(name) for name in columns), SQLITE_TABLE,
+                where),
+            connection,
+            params=parameters)
+    finally:
+        connection.close()
+
+    # Before Python 3.7, sqlite3 cuts column names at " [", e.g. `run time
+    # [min]` is returned as `run time`. The columns are selected explicitly,
+    # so their names are known.
+    df.columns = columns
+    return df
+
+
+def _float_integers(df):
+    """Convert nullable integer columns, e.g. `ncores`, to floats.
+
+    Missing values become NaN. Older versions of pandas and pyarrow cannot
+    write nullable integers, so they are restored with `dtypes` when the
+    store is read.
+    """
+    return df.assign(
+        **{
+            name: df[name].astype('float64')
+            for name, dtype in df.dtypes.items()
+            if pd.api.types.is_extension_array_dtype(dtype)
+            and pd.api.types.is_integer_dtype(dtype)
+        })
+
+
+def _sqlite_rows(df):
+    """Convert the rows of `df` to tuples of python objects for sqlite3."""
+    # Nullable integers would be converted to numpy scalars. As floats, they
+    # are turned back into integers by the affinity of the column.
+    df = _float_integers(df)
+    columns = []
+    for name in df.columns:
+        values = df[name]
+        # Missing values are stored as NULL.
+        if values.isnull().any():
+            values = values.astype(object).where(values.notnull(), None)
+        columns.append(values.tolist())
+    return list(zip(*columns))
+
+
+def _write_sqlite(df, filename, append=True):
+    connection = sqlite3.connect(filename)
+    try:
+        # The connection commits all changes at once or none at all.
+        with connection:
+            if not append:
+                connection.execute('DROP TABLE IF EXISTS {}'.format(
+                    SQLITE_TABLE))
+
+            columns = [
+                row[1] for row in connection.execute(
+                    'PRAGMA table_info({})'.format(SQLITE_TABLE))
+            ]
+            if not columns:
+                connection.execute('CREATE TABLE {} ({} TEXT)'.format(
+                    SQLITE_TABLE, _quote(STORE_KEY)))
+                columns = [STORE_KEY]
+            elif STORE_DATE in columns:
+                # Benchmarks that are stored again keep their date.
+                dates = dict(
+                    connection.execute('SELECT {}, {} FROM {}'.format(
+                        _quote(STORE_KEY), _quote(STORE_DATE),
+                        SQLITE_TABLE)))
+                df = df.assign(**{
+                    STORE_DATE:
+                    df[STORE_KEY].map(dates).fillna(df[STORE_DATE])
+                })
+
+            # Further values parsed from the log files can add new columns.
+            for name, dtype in df.dtypes.items():
+                if name not in columns:
+                    connection.execute('ALTER TABLE {} ADD COLUMN {} {}'.format(
+                        SQLITE_TABLE, _quote(name), _sqlite_type(dtype)))
+
+            # `INSERT OR REPLACE` works with all versions of SQLite, unlike
+            # `ON CONFLICT ... DO UPDATE`. Columns missing in `df` are NULL
+            # afterwards, as in `merge_results`.
+            names = [_quote(name) for name in df.columns]
+            connection.executemany(
+                'INSERT OR REPLACE INTO {} ({}) VALUES ({})'.format(
+                    SQLITE_TABLE, ', '.join(names), ', '.join(
+                        '?' * len(names))), _sqlite_rows(df))
+
+            # The indices are created after the columns they refer to. For a
+            # new store, building them once after inserting all rows is
+            # faster than updating them row by row.
+            connection.execute(
+                'CREATE UNIQUE INDEX IF NOT EXISTS {0}_key ON {0} ({1})'.format(
+                    SQLITE_TABLE, _quote(STORE_KEY)))
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS {0}_index ON {0} ({1})'.format(
+                    SQLITE_TABLE, ', '.join(
+                        _quote(name) for name in SQLITE_INDEX)))
+    finally:
+        connection.close()
+
+
+def read_store(filename, columns=None, dtypes=None):
+    """Load a result store.
+
+    Parameters
+    ----------
+    filename : str
+        Path of the Parquet, Feather or SQLite file.
+    columns : list
+        Only read these columns. All formats store their columns separately,
+        so the other columns are not read from disk at all.
+    dtypes : dict
+        Data types of the columns. SQLite only knows a few basic types, so
+        for example boolean and categorical columns have to be converted.
+
+    Returns
+    -------
+    pandas.DataFrame
+    """
+    return query_store(filename, columns=columns, dtypes=dtypes)
+
+
+def query_store(filename, columns=None, dtypes=None, since=None, **filters):
+    """Select benchmarks from a result store.
+
+    Parameters
+    ----------
+    filename : str
+        Path of the Parquet, Feather or SQLite file.
+    columns : list
+        Only read these columns.
+    dtypes : dict
+        Data types of the columns, see `read_store`.
+    since : str
+        Only select benchmarks that were added to the store at or after this
+        date, given as `YYYY-MM-DD`.
+    **filters
+        Only select benchmarks with one of the given values of a column, e.g.
+        `host=['draco', 'hydra']`. Empty lists and `None` are ignored.
+
+    Returns
+    -------
+    pandas.DataFrame
+    """
+    file_format = store_format(filename)
+    filters = {
+        name: list(values)
+        for name, values in filters.items() if values is not None and len(values)
+    }
+
+    if file_format == 'sqlite':
+        df = _read_sqlite(filename, columns, filters, since)
+    else:
+        try:
+            if file_format == 'parquet':
+                df = pd.read_parquet(filename, columns=columns)
+            else:
+                df = pd.read_feather(filename, columns=columns)
+        except ImportError:
+            console.error('Reading {} files requires pyarrow. Install it with '
+                          '"pip install pyarrow".', file_format)
+
+        mask = pd.Series(True, index=df.index)
+        for name, values in filters.items():
+            mask &= df[name].isin(values)
+        if since is not None:
+            mask &= df[STORE_DATE] >= since
+        df = df[mask].reset_index(drop=True)
+
+    for name, dtype in (dtypes or {}).items():
+        if name in df:
+            df[name] = df[name].astype(dtype)
+
+    return df
+
+
+def merge_results(store, df):
+    """Merge new results into the results of a store.
+
+    Benchmarks that are already in the store are replaced by their new
+    results, but keep the date at which they were added. Columns missing in
+    either frame are filled with NaN.
+    """
+    if STORE_DATE in store:
+        dates = store.set_index(STORE_KEY)[STORE_DATE]
+        df = df.assign(**{
+            STORE_DATE: df[STORE_KEY].map(dates).fillna(df[STORE_DATE])
+        })
+
+    store = store[~store[STORE_KEY].isin(df[STORE_KEY])]
+    merged = pd.concat([store, df], ignore_index=True, sort=False)
+
+    # Categorical columns with different categories are concatenated as
+    # objects.
+    for name, dtype in df.dtypes.items():
+        if pd.api.types.is_categorical_dtype(dtype):
+            merged[name] = merged[name].astype('category')
+
+    return merged
+
+
+def write_store(df, filename, append=True, date=None):
+    """Write the results of the analysis to a result store.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Results of the analysis. Must contain the `STORE_KEY` column.
+    filename : str
+        Path of the Parquet, Feather or SQLite file.
+    append : bool
+        Merge the results into an existing store. Otherwise it is replaced.
+    date : datetime.datetime
+        Date at which new benchmarks are added. Defaults to now.
+    """
+    file_format = store_format(filename)
+    if date is None:
+        date = dt.datetime.now()
+    df = df.assign(**{STORE_DATE: date.strftime(DATE_FORMAT)})
+
+    if file_format == 'sqlite':
+        _write_sqlite(df, filename, append=append)
+        return
+
+    if append and os.path.exists(filename):
+        df = merge_results(read_store(filename), df)
+    df = _float_integers(df).reset_index(drop=True)
+
+    # Write to a temporary file first, so that an interrupted analysis does
+    # not leave a corrupt store behind.
+    tmp_filename = '{}.tmp'.format(filename)
+    try:
+        if file_format == 'parquet':
+            df.to_parquet(tmp_filename, index=False)
+        else:
+            df.to_feather(tmp_filename)
+    except ImportError:
+        console.error('Writing {} files requires pyarrow. Install it with '
+                      '"pip install pyarrow".', file_format)
+    os.rename(tmp_filename, filename)
@@ -25,6 +25,7 @@ import click
 import mdsynthesis as mds
 
 from . import console
+from .discover import discover
 from .mdengines import detect_md_engine
 from .cli import cli
 
@@ -55,7 +56,11 @@ def get_batch_command():
     'force_restart',
     help='Resubmit all benchmarks and delete all previous results.',
     is_flag=True)
-def submit(directory, force_restart):
+@click.option(
+    '--index',
+    is_flag=True,
+    help='Store the discovered benchmarks in an index to speed up later runs.')
+def submit(directory, force_restart, index):
     """Submit benchmarks to queuing system.
 
     benchmarks are searched recursively starting from the directory specified
@@ -65,17 +70,16 @@ def submit(directory, force_restart):
     Only runs benchmarks that were not already started. Can be overwritten with
     `--force`.
     """
-    bundle = mds.discover(directory)
+    bundle = discover(directory, index=index)
 
     # Exit if no bundles were found in the current directory.
     if not bundle:
         console.error('No benchmarks found.')
 
-    grouped_bundles = bundle.categories.groupby('started')
-    try:
-        bundles_not_yet_started = grouped_bundles[False]
-    except KeyError:
-        bundles_not_yet_started = None
+    bundles_not_yet_started = [
+        benchmark for benchmark in bundle
+        if not benchmark.categories.get('started')
+    ]
 
     if not bundles_not_yet_started and not force_restart:
         console.error('All generated benchmarks were already started once. '
@@ -90,10 +94,14 @@ def submit(directory, force_restart):
     batch_cmd = get_batch_command()
     console.info('Submitting a total of {} benchmarks.', len(bundles_to_start))
 
-    for sim in bundles_to_start:
+    for benchmark in bundles_to_start:
+        # Only load the full Sim for the benchmarks that we actually start.
+        sim = mds.Sim(benchmark.abspath)
+
         # Remove files generated by previous mdbenchmark run
         if force_restart:
-            detect_md_engine(sim['module']).cleanup_before_restart(sim)
+            engine = detect_md_engine(sim.categories['module'])
+            engine.cleanup_before_restart(sim)
 
         sim.categories['started'] = True
         os.chdir(sim.abspath)
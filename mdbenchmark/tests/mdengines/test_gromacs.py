@@ -24,11 +24,15 @@ import click
 import datreant.core as dtr
 import numpy as np
 import pytest
+from numpy.testing import assert_equal
 from six.moves import StringIO
+from six import BytesIO
 
 from mdbenchmark.ext.click_test import cli_runner
 from mdbenchmark.mdengines import gromacs
 
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
 
 @pytest.fixture
 def log():
@@ -58,6 +62,192 @@ def test_parse_empty_log(empty_log, parse):
     assert np.isnan(parse(empty_log))
 
 
+def test_parse_log():
+    log = BytesIO(b"""
+    Running on 1 node with total 32 cores, 64 logical cores, 0 compatible GPUs
+    Started mdrun on rank 0 Mon Dec 11 09:14:55 2017
+                   Core t (s)   Wall t (s)        (%)
+           Time:    28800.000      900.000     3200.0
+                     (ns/day)    (hour/ns)
+    Performance:           123.45           0.194
+    Finished mdrun on rank 0 Mon Dec 11 09:29:46 2017
+    """)
+    values = gromacs.parse_log(log)
+    assert {name: values.pop(name) for name in list(values)
+            if not np.isnan(values[name])} == {
+        'ns/day': 123.45,
+        'hours/ns': 0.194,
+        'ncores': 32,
+        'core time [s]': 28800.,
+        'wall time [s]': 900.,
+        'core/wall [%]': 3200.,
+        'cpu efficiency': 1.,
+    }
+    # A simulation on a single rank without PME tuning.
+    assert sorted(values) == [
+        'dd grid', 'engine version', 'load imbalance [%]',
+        'load imbalance loss [%]', 'pme grid', 'pme ranks',
+        'pme/pp imbalance loss [%]', 'pme/pp load', 'rcoulomb'
+    ]
+
+
+HEADER = b"""
+GROMACS version:    2018.3
+Running on 1 node with total 32 cores, 64 logical cores, 0 compatible GPUs
+Domain decomposition grid 4 x 3 x 2, separate PME ranks 8
+PME domain decomposition: 8 x 1 x 1
+Started mdrun on rank 0 Mon Dec 11 09:14:55 2017
+           Step           Time
+              0        0.00000
+
+step   80: timed with pme grid 96 96 96, coulomb cutoff 1.200: 3567.4 M-cycles
+step  160: timed with pme grid 84 84 84, coulomb cutoff 1.304: 3311.2 M-cycles
+              optimal pme grid 84 84 84, coulomb cutoff 1.304
+           Step           Time
+           1000        2.00000
+"""
+
+DD_STATISTICS = b"""
+        M E G A - F L O P S   A C C O U N T I N G
+
+ Computing:                               M-Number         M-Flops  % Flops
+-----------------------------------------------------------------------------
+ NB VdW [V&F]                           150.304692         150.305     0.0
+-----------------------------------------------------------------------------
+ Total                                                 5217871.211   100.0
+-----------------------------------------------------------------------------
+
+    D O M A I N   D E C O M P O S I T I O N   S T A T I S T I C S
+
+ av. #atoms communicated per step for force:  2 x 1093716.4
+
+ Dynamic load balancing report:
+ DLB was turned on during the run due to measured imbalance.
+ Average load imbalance: 4.2%.
+ The balanceable part of the MD step is 78%, load imbalance is computed from this.
+ Part of the total run time spent waiting due to load imbalance: 3.3%.
+ Average PME mesh/force load: 0.962
+ Part of the total run time spent waiting due to PP/PME imbalance: 1.0 %
+
+"""
+
+CYCLE_ACCOUNTING = b"""
+     R E A L   C Y C L E   A N D   T I M E   A C C O U N T I N G
+
+On 24 MPI ranks doing PP, each using 1 OpenMP threads, and
+on 8 MPI ranks doing PME
+
+ Computing:          Num   Num      Call    Wall time         Giga-Cycles
+                     Ranks Threads  Count      (s)         total sum    %
+-----------------------------------------------------------------------------
+ Domain decomp.        24    1        501       1.390         95.925   2.9
+ Neighbor search       24    1        501       0.671         46.293   1.4
+ Force                 24    1      25000      33.263       2295.147  69.9
+ Wait + Comm. F        24    1      25000       3.022        208.484   6.4
+ PME mesh               8    1      25000       8.012        552.812   8.3
+ Rest                                           0.532         36.734   1.1
+-----------------------------------------------------------------------------
+ Total                                         47.590       3283.745 100.0
+-----------------------------------------------------------------------------
+ Breakdown of PME mesh computation
+-----------------------------------------------------------------------------
+ PME 3D-FFT             8    1      50000       2.100        144.900   2.2
+-----------------------------------------------------------------------------
+
+               Core t (s)   Wall t (s)        (%)
+       Time:     1522.880       47.590     3200.0
+                 (ns/day)    (hour/ns)
+Performance:       98.147        0.245
+Finished mdrun on rank 0 Mon Dec 11 09:29:46 2017
+"""
+
+CYCLE_ACCOUNTING_VALUES = {
+    'Domain decomp. [%]': 2.9,
+    'Neighbor search [%]': 1.4,
+    'Force [%]': 69.9,
+    'Wait + Comm. F [%]': 6.4,
+    'PME mesh [%]': 8.3,
+    'Rest [%]': 1.1,
+}
+
+
+def test_parse_cycle_accounting():
+    lines = CYCLE_ACCOUNTING.decode().splitlines()
+    assert gromacs.parse_cycle_accounting(lines) == CYCLE_ACCOUNTING_VALUES
+    assert gromacs.parse_cycle_accounting(['Performance: 1.0']) == {}
+
+
+def test_parse_log_cycle_accounting():
+    log = BytesIO(HEADER + b'Step Time\n' * 100 + DD_STATISTICS +
+                  CYCLE_ACCOUNTING)
+    values = gromacs.parse_log(log)
+    assert values['engine version'] == '2018.3'
+    assert values['dd grid'] == '4x3x2'
+    assert values['pme ranks'] == 8
+    assert values['pme grid'] == '84x84x84'
+    assert values['rcoulomb'] == 1.304
+    assert values['load imbalance [%]'] == 4.2
+    assert values['load imbalance loss [%]'] == 3.3
+    assert values['pme/pp load'] == 0.962
+    assert values['pme/pp imbalance loss [%]'] == 1.0
+    assert values['ns/day'] == 98.147
+    assert values['hours/ns'] == 0.245
+    assert values['ncores'] == 32
+    assert values['core time [s]'] == 1522.88
+    assert values['wall time [s]'] == 47.59
+    assert values['core/wall [%]'] == 3200.0
+    assert values['cpu efficiency'] == pytest.approx(1.)
+    for name, value in CYCLE_ACCOUNTING_VALUES.items():
+        assert values[name] == value
+
+
+def test_parse_log_old_format():
+    """Test the domain decomposition statistics of GROMACS 4.6."""
+    log = BytesIO(b"""
+Gromacs version:    VERSION 4.6.7
+Domain decomposition grid 8 x 4 x 1, separate PME nodes 0
+Started mdrun on rank 0 Mon Dec 11 09:14:55 2017
+
+        M E G A - F L O P S   A C C O U N T I N G
+
+    D O M A I N   D E C O M P O S I T I O N   S T A T I S T I C S
+
+ Average load imbalance: 5.3 %
+ Part of the total run time spent waiting due to load imbalance: 3.9 %
+""")
+    values = gromacs.parse_log(log)
+    assert values['engine version'] == '4.6.7'
+    assert values['dd grid'] == '8x4x1'
+    assert values['pme ranks'] == 0
+    assert values['load imbalance [%]'] == 5.3
+    assert values['load imbalance loss [%]'] == 3.9
+    assert np.isnan(values['pme/pp load'])
+
+
+def test_parse_log_empty():
+    values = gromacs.parse_log(BytesIO(b'not the log you are looking for'))
+    assert len(values) == 16
+    assert all(np.isnan(value) for value in values.values())
+
+
+@pytest.mark.parametrize('folder, ns_day, ncores', (
+    ('1', 98.147, 32),
+    ('7', np.nan, 160),
+    ('8', 254.266, np.nan),
+))
+def test_parse_output_file(folder, ns_day, ncores):
+    """Test that the tail parser agrees with the line based parsers."""
+    filename = os.path.join(DATA_DIR, 'analyze-files-w-errors', folder,
+                            'bench.log')
+    values = gromacs.parse_output_file(filename)
+    with open(filename) as fh:
+        assert_equal(values['ns/day'], gromacs.parse_ns_day(fh))
+        fh.seek(0)
+        assert_equal(values['ncores'], gromacs.parse_ncores(fh))
+    assert_equal(values['ns/day'], ns_day)
+    assert_equal(values['ncores'], ncores)
+
+
 @pytest.fixture
 def sim(tmpdir_factory):
     folder = tmpdir_factory.mktemp('simulation')
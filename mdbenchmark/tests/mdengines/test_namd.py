@@ -18,16 +18,18 @@
 # You should have received a copy of the GNU General Public License
 # along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
 import os
+import re
 from glob import glob
 
 import click
 import datreant.core as dtr
 import numpy as np
 import pytest
+from numpy.testing import assert_almost_equal
 from six.moves import StringIO
 
 from mdbenchmark.ext.click_test import cli_runner
-from mdbenchmark.mdengines import namd
+from mdbenchmark.mdengines import namd, parsing
 
 
 @pytest.fixture
@@ -57,6 +59,64 @@ def test_parse_empty_log(empty_log, parse):
     assert np.isnan(parse(empty_log))
 
 
+def test_parse_log():
+    """Test that we average all but the first benchmark measurement."""
+    lines = [
+        'Info: NAMD 2.12 for Linux-x86_64-MPI',
+        'Info: TIMESTEP               2',
+        'Info: Benchmark time: 32 CPUs 0.0100 s/step 0.116 days/ns 1 MB memory',
+        'Info: Benchmark time: 32 CPUs 0.0080 s/step 0.093 days/ns 1 MB memory',
+        'Info: Benchmark time: 32 CPUs 0.0090 s/step 0.104 days/ns 1 MB memory',
+    ]
+    values = namd.parse_log(lines)
+    ns_day = 86400 / np.array([0.008, 0.009]) * 2e-6
+    assert_almost_equal(values['ns/day'], ns_day.mean())
+    assert_almost_equal(values['ns/day std'], ns_day.std(ddof=1))
+    assert values['ns/day samples'] == 2
+    assert values['ncores'] == 32
+    assert values['engine version'] == '2.12'
+
+
+def test_parse_log_single_sample(log):
+    values = namd.parse_log(log)
+    assert values['ns/day'] == 1 / 13.1013
+    assert np.isnan(values['ns/day std'])
+    assert values['ns/day samples'] == 1
+
+
+def test_parse_log_version(monkeypatch):
+    """Test that the patterns are selected by the version of NAMD."""
+    formats = parsing.LogFormatRegistry(namd.VERSION)
+    formats.register({
+        'timestep': namd.TIMESTEP,
+        'benchmark': namd.BENCHMARK_TIME
+    })
+    formats.register(
+        {
+            'timestep': namd.TIMESTEP,
+            'benchmark': re.compile(r'Benchmark: (\d+) CPUs (\S+) s/step (\S+)')
+        },
+        min_version='3.0')
+    monkeypatch.setattr(namd, 'LOG_FORMATS', formats)
+
+    lines = ['Info: TIMESTEP 2', 'Info: Benchmark: 32 CPUs 0.0100 s/step 0.116']
+    values = namd.parse_log(['Info: NAMD 3.0 for Linux-x86_64-MPI'] + lines)
+    assert values['engine version'] == '3.0'
+    assert values['ns/day samples'] == 1
+    assert_almost_equal(values['ns/day'], 86400 / 0.01 * 2e-6)
+
+    values = namd.parse_log(['Info: NAMD 2.12 for Linux-x86_64-MPI'] + lines)
+    assert np.isnan(values['ns/day samples'])
+
+
+def test_parse_log_empty(empty_log):
+    values = namd.parse_log(empty_log)
+    assert np.isnan(values['ns/day'])
+    assert np.isnan(values['ncores'])
+    assert np.isnan(values['engine version'])
+    assert np.isnan(values['ns/day samples'])
+
+
 @pytest.fixture
 def sim(tmpdir_factory):
     folder = tmpdir_factory.mktemp('simulation')
@@ -0,0 +1,139 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017 Max Linke & Michael Gecht and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import re
+
+import numpy as np
+import pytest
+from six import BytesIO
+from six.moves import StringIO
+
+from mdbenchmark.mdengines import parsing
+
+FIELDS = {
+    'ns/day': (re.compile(r'Performance:\s+(\S+)'), float),
+    'ncores': (re.compile(r'total (\d+) cores'), int),
+}
+
+
+class CountingLines(object):
+    """Iterate over lines and count how many were consumed."""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.consumed = 0
+
+    def __iter__(self):
+        for line in self.lines:
+            self.consumed += 1
+            yield line
+
+
+def test_extract_fields():
+    lines = CountingLines([
+        'Running on 1 node with total 32 cores',
+        'Running on 2 nodes with total 64 cores',
+        'Performance:   123.45   0.123',
+        'Performance:   543.21   0.123',
+    ])
+    values = dict(parsing.extract_fields(lines, FIELDS))
+    assert values == {'ns/day': 123.45, 'ncores': 32}
+    # We stop reading as soon as all fields were found
+    assert lines.consumed == 3
+
+
+def test_extract_fields_converter_groups():
+    fields = {'grid': (re.compile(r'grid (\d+) x (\d+) x (\d+)'),
+                       lambda *grid: tuple(int(x) for x in grid))}
+    values = dict(parsing.extract_fields(['grid 4 x 2 x 1'], fields))
+    assert values == {'grid': (4, 2, 1)}
+
+
+def test_parse_fields_missing():
+    values = parsing.parse_fields(['Performance:   123.45   0.123'], FIELDS)
+    assert values['ns/day'] == 123.45
+    assert np.isnan(values['ncores'])
+
+
+@pytest.mark.parametrize('fh', (StringIO(u'a\nstop\nb\n'),
+                                BytesIO(b'a\nstop\nb\n')))
+def test_read_lines(fh):
+    assert list(parsing.read_lines(fh)) == ['a\n', 'stop\n', 'b\n']
+    fh.seek(0)
+    assert list(parsing.read_lines(fh, stop='stop')) == ['a\n', 'stop\n']
+    fh.seek(0)
+    assert list(parsing.read_lines(fh, max_size=1)) == ['a\n']
+
+
+@pytest.mark.parametrize('block_size', (1, 7, 4096))
+def test_read_lines_backwards(block_size):
+    fh = BytesIO(b'first\nsecond\n\nlast')
+    lines = list(parsing.read_lines_backwards(fh, block_size=block_size))
+    assert lines == ['last', '', 'second', 'first']
+
+    # Incomplete lines at the size limit are dropped
+    lines = list(
+        parsing.read_lines_backwards(fh, max_size=10, block_size=block_size))
+    assert lines == ['last', '']
+
+    lines = list(
+        parsing.read_lines_backwards(fh, stop='sec', block_size=block_size))
+    assert lines == ['last', '', 'second']
+
+
+@pytest.mark.parametrize('version, parsed', (
+    ('2018.3', (2018, 3)),
+    ('5.1.4', (5, 1, 4)),
+    ('3.0b1', (3, 0)),
+    ('VERSION', ()),
+))
+def test_parse_version(version, parsed):
+    assert parsing.parse_version(version) == parsed
+
+
+@pytest.fixture
+def registry():
+    registry = parsing.LogFormatRegistry(re.compile(r'version (\S+)'))
+    registry.register('latest')
+    registry.register('old', max_version='5.0')
+    registry.register('new', min_version='2018')
+    return registry
+
+
+@pytest.mark.parametrize('version, patterns', (
+    ('4.6.7', 'old'),
+    ('5.0', 'latest'),
+    ('2016.3', 'latest'),
+    ('2018', 'new'),
+    ('2019.1', 'new'),
+    (None, 'new'),
+))
+def test_log_format_registry_lookup(registry, version, patterns):
+    assert registry.lookup(version) == patterns
+
+
+def test_log_format_registry_detect_version(registry):
+    assert registry.detect_version('engine version 2018.3') == '2018.3'
+    assert registry.detect_version('Started mdrun') is None
+
+
+def test_log_format_registry_empty():
+    registry = parsing.LogFormatRegistry(re.compile(r'version (\S+)'))
+    with pytest.raises(LookupError):
+        registry.lookup()
@@ -18,9 +18,21 @@
 # You should have received a copy of the GNU General Public License
 # along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
 import os
+import shutil
+
+import mdsynthesis as mds
+import numpy as np
 
 from mdbenchmark import cli
+from mdbenchmark.analyze import (COLUMNS, FIT_COLUMNS, GROUP_COLUMNS,
+                                  RECOMMEND_COLUMNS, SCALING_COLUMNS,
+                                  analyze_benchmark, build_dataframe,
+                                  calc_scaling, fit_scaling, group_columns,
+                                  plot_analysis, recommend_nodes,
+                                  series_label)
+from mdbenchmark.utils import amdahl, usl
 from mdbenchmark.ext.click_test import cli_runner
+from mdbenchmark.mdengines import gromacs
 from mdbenchmark.testing import data
 
 
@@ -33,12 +45,41 @@ def test_analyze_gromacs(cli_runner, tmpdir, data):
             '--directory={}'.format(data['analyze-files-gromacs']),
         ])
         assert result.exit_code == 0
-        assert result.output == """           module  nodes   ns/day  run time [min]    gpu   host  ncores
-0  gromacs/2016.3      1   98.147              15  False  draco      32
-1  gromacs/2016.3      2  178.044              15  False  draco      64
-2  gromacs/2016.3      3  226.108              15  False  draco      96
-3  gromacs/2016.3      4  246.973              15  False  draco     128
-4  gromacs/2016.3      5  254.266              15  False  draco     160
+        assert result.output == """           module  nodes   ns/day  run time [min]    gpu   host  ncores speedup efficiency node-hours/ns core-hours/ns
+0  gromacs/2016.3      1   98.147              15  False  draco      32    1.00       1.00         0.245          7.82
+1  gromacs/2016.3      2  178.044              15  False  draco      64    1.81       0.91         0.270          8.63
+2  gromacs/2016.3      3  226.108              15  False  draco      96    2.30       0.77         0.318         10.19
+3  gromacs/2016.3      4  246.973              15  False  draco     128    2.52       0.63         0.389         12.44
+4  gromacs/2016.3      5  254.266              15  False  draco     160    2.59       0.52         0.472         15.10
+Scaling models fitted to the benchmarks:
+    host          module    gpu amdahl ns/day serial fraction usl ns/day contention coherency peak nodes
+0  draco  gromacs/2016.3  False       107.213          0.2564     98.547     0.0336   0.04041        4.9
+"""
+
+
+def test_analyze_gromacs_jobs(cli_runner, tmpdir, data):
+    """Test that analyzing benchmarks in parallel yields the serial output."""
+    with tmpdir.as_cwd():
+
+        result = cli_runner.invoke(cli.cli, [
+            'analyze',
+            '--directory={}'.format(data['analyze-files-w-errors']),
+            '--jobs=4',
+        ])
+        assert result.exit_code == 0
+        assert result.output == """WARNING We were not able to gather informations for all systems. Systems marked with question marks have either crashed or were not started yet.
+           module  nodes   ns/day  run time [min]    gpu   host ncores speedup efficiency node-hours/ns core-hours/ns
+0  gromacs/2016.3      1   98.147              15  False  draco     32    1.00       1.00         0.245          7.82
+1  gromacs/2016.3      2  178.044              15  False  draco     64    1.81       0.91         0.270          8.63
+2  gromacs/2016.3      3  226.108              15  False  draco     96    2.30       0.77         0.318         10.19
+3  gromacs/2016.3      4  246.973              15  False  draco    128    2.52       0.63         0.389         12.44
+4  gromacs/2016.3      5  254.266              15  False  draco    160    2.59       0.52         0.472         15.10
+5  gromacs/2016.3      6        ?              15  False  draco      ?       ?          ?             ?             ?
+6  gromacs/2016.3      7        ?              15  False  draco    160       ?          ?             ?             ?
+7  gromacs/2016.3      8  254.266              15  False  draco      ?    2.59       0.32         0.755             ?
+Scaling models fitted to the benchmarks:
+    host          module    gpu amdahl ns/day serial fraction usl ns/day contention coherency peak nodes
+0  draco  gromacs/2016.3  False       122.540          0.3824    100.953     0.1102   0.02526        5.9
 """
 
 
@@ -48,12 +89,120 @@ def test_analze_namd(cli_runner, tmpdir, data):
             cli.cli,
             ['analyze', '--directory={}'.format(data['analyze-files-namd'])])
         assert result.exit_code == 0
-        assert result.output == """  module  nodes    ns/day  run time [min]    gpu   host  ncores
-0   namd      1  0.076328              15  False  draco       1
-1   namd      2  0.076328              15  False  draco       1
+        assert result.output == """  module  nodes    ns/day  run time [min]    gpu   host  ncores speedup efficiency node-hours/ns core-hours/ns
+0   namd      1  0.076328              15  False  draco       1    1.00       1.00       314.431        314.43
+1   namd      2  0.076328              15  False  draco       1    1.00       0.50       628.862        314.43
+Scaling models fitted to the benchmarks:
+    host module    gpu amdahl ns/day serial fraction usl ns/day contention coherency peak nodes
+0  draco   namd  False         0.076          1.0000          ?          ?         ?          ?
 """
 
 
+def test_analyze_recommend(cli_runner, tmpdir, data):
+    """Test that the recommended number of nodes is shown."""
+    with tmpdir.as_cwd():
+
+        result = cli_runner.invoke(cli.cli, [
+            'analyze',
+            '--directory={}'.format(data['analyze-files-gromacs']),
+            '--recommend',
+            '--min-efficiency=0.9',
+        ])
+        assert result.exit_code == 0
+        assert result.output.endswith("""           module  nodes   ns/day  run time [min]    gpu   host  ncores speedup efficiency node-hours/ns core-hours/ns
+0  gromacs/2016.3      1   98.147              15  False  draco      32    1.00       1.00         0.245          7.82
+1  gromacs/2016.3      2  178.044              15  False  draco      64    1.81       0.91         0.270          8.63
+2  gromacs/2016.3      3  226.108              15  False  draco      96    2.30       0.77         0.318         10.19
+3  gromacs/2016.3      4  246.973              15  False  draco     128    2.52       0.63         0.389         12.44
+4  gromacs/2016.3      5  254.266              15  False  draco     160    2.59       0.52         0.472         15.10
+Scaling models fitted to the benchmarks:
+    host          module    gpu amdahl ns/day serial fraction usl ns/day contention coherency peak nodes
+0  draco  gromacs/2016.3  False       107.213          0.2564     98.547     0.0336   0.04041        4.9
+Recommended number of nodes with a parallel efficiency of at least 90%:
+    host          module    gpu  nodes   ns/day efficiency  cheapest nodes  cheapest ns/day core-hours/ns
+0  draco  gromacs/2016.3  False      2  178.044       0.91               1           98.147          7.82
+""")
+
+        result = cli_runner.invoke(cli.cli, [
+            'analyze',
+            '--directory={}'.format(data['analyze-files-gromacs']),
+            '--recommend',
+            '--min-efficiency=1.5',
+        ])
+        assert result.exit_code == 1
+        assert result.output == 'ERROR The parallel efficiency must be ' \
+            'larger than 0 and at most 1.\n'
+
+
+def test_analyze_watch(cli_runner, tmpdir, data, monkeypatch):
+    """Test that watch mode only parses modified log files again."""
+    folder = str(tmpdir.join('benchmarks'))
+    shutil.copytree(data['analyze-files-w-errors'], folder)
+
+    parsed = []
+    parse_output_file = gromacs.parse_output_file
+
+    def counting_parse(filename):
+        parsed.append(filename)
+        return parse_output_file(filename)
+
+    def sleep(interval):
+        assert interval == 0.5
+        if len(parsed) > 7:
+            raise KeyboardInterrupt
+        with open(os.path.join(folder, '1', 'bench.log'), 'a') as fh:
+            fh.write('\n')
+
+    monkeypatch.setattr(gromacs, 'parse_output_file', counting_parse)
+    monkeypatch.setattr('mdbenchmark.analyze.time.sleep', sleep)
+
+    with tmpdir.as_cwd():
+        result = cli_runner.invoke(cli.cli, [
+            'analyze',
+            '--directory={}'.format(folder),
+            '--watch',
+            '--interval=0.5',
+            '--no-csv',
+        ])
+        assert result.exit_code == 0
+        assert result.output.startswith('Watching 8 benchmarks, updated at ')
+        # The table is only redrawn when it changes.
+        assert result.output.count('module  nodes') == 2
+
+    # One benchmark has no log file and only the modified one is parsed again.
+    assert len(parsed) == 8
+    assert parsed[-1].endswith(os.path.join('benchmarks', '1', 'bench.log'))
+
+
+def test_analyze_watch_interrupt(cli_runner, tmpdir, data, monkeypatch):
+    """Test that watch mode can be stopped before the first update."""
+    parsed = []
+    parse_output_file = gromacs.parse_output_file
+
+    def counting_parse(filename):
+        parsed.append(filename)
+        return parse_output_file(filename)
+
+    def sleep(interval):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(gromacs, 'parse_output_file', counting_parse)
+    monkeypatch.setattr('mdbenchmark.analyze.time.sleep', sleep)
+
+    with tmpdir.as_cwd():
+        result = cli_runner.invoke(cli.cli, [
+            'analyze',
+            '--directory={}'.format(data['analyze-files-w-errors']),
+            '--watch',
+            '--no-csv',
+        ])
+        assert result.exit_code == 0
+        assert result.output.count('module  nodes') == 2
+
+    # The initial results are shown without analyzing the benchmarks again.
+    assert len(parsed) == 7
+
+
 def test_analyze_with_errors(cli_runner, tmpdir, data):
     """Test that we warn the user of errors in the output files. Also test that we
 show a question mark instead of a float in the corresponding cell.
@@ -66,15 +215,18 @@ show a question mark instead of a float in the corresponding cell.
         ])
         assert result.exit_code == 0
         assert result.output == """WARNING We were not able to gather informations for all systems. Systems marked with question marks have either crashed or were not started yet.
-           module  nodes   ns/day  run time [min]    gpu   host ncores
-0  gromacs/2016.3      1   98.147              15  False  draco     32
-1  gromacs/2016.3      2  178.044              15  False  draco     64
-2  gromacs/2016.3      3  226.108              15  False  draco     96
-3  gromacs/2016.3      4  246.973              15  False  draco    128
-4  gromacs/2016.3      5  254.266              15  False  draco    160
-5  gromacs/2016.3      6        ?              15  False  draco      ?
-6  gromacs/2016.3      7        ?              15  False  draco    160
-7  gromacs/2016.3      8  254.266              15  False  draco      ?
+           module  nodes   ns/day  run time [min]    gpu   host ncores speedup efficiency node-hours/ns core-hours/ns
+0  gromacs/2016.3      1   98.147              15  False  draco     32    1.00       1.00         0.245          7.82
+1  gromacs/2016.3      2  178.044              15  False  draco     64    1.81       0.91         0.270          8.63
+2  gromacs/2016.3      3  226.108              15  False  draco     96    2.30       0.77         0.318         10.19
+3  gromacs/2016.3      4  246.973              15  False  draco    128    2.52       0.63         0.389         12.44
+4  gromacs/2016.3      5  254.266              15  False  draco    160    2.59       0.52         0.472         15.10
+5  gromacs/2016.3      6        ?              15  False  draco      ?       ?          ?             ?             ?
+6  gromacs/2016.3      7        ?              15  False  draco    160       ?          ?             ?             ?
+7  gromacs/2016.3      8  254.266              15  False  draco      ?    2.59       0.32         0.755             ?
+Scaling models fitted to the benchmarks:
+    host          module    gpu amdahl ns/day serial fraction usl ns/day contention coherency peak nodes
+0  draco  gromacs/2016.3  False       122.540          0.3824    100.953     0.1102   0.02526        5.9
 """
 
 
@@ -83,17 +235,85 @@ def test_analyze_plot(cli_runner, tmpdir, data):
 
         result = cli_runner.invoke(cli.cli, [
             'analyze',
-            '--directory={}'.format(data['analyze-files-gromacs'], '--plot'),
+            '--directory={}'.format(data['analyze-files-gromacs']),
+            '--plot',
         ])
         assert result.exit_code == 0
-        assert result.output == """           module  nodes   ns/day  run time [min]    gpu   host  ncores
-0  gromacs/2016.3      1   98.147              15  False  draco      32
-1  gromacs/2016.3      2  178.044              15  False  draco      64
-2  gromacs/2016.3      3  226.108              15  False  draco      96
-3  gromacs/2016.3      4  246.973              15  False  draco     128
-4  gromacs/2016.3      5  254.266              15  False  draco     160
+        assert result.output == """           module  nodes   ns/day  run time [min]    gpu   host  ncores speedup efficiency node-hours/ns core-hours/ns
+0  gromacs/2016.3      1   98.147              15  False  draco      32    1.00       1.00         0.245          7.82
+1  gromacs/2016.3      2  178.044              15  False  draco      64    1.81       0.91         0.270          8.63
+2  gromacs/2016.3      3  226.108              15  False  draco      96    2.30       0.77         0.318         10.19
+3  gromacs/2016.3      4  246.973              15  False  draco     128    2.52       0.63         0.389         12.44
+4  gromacs/2016.3      5  254.266              15  False  draco     160    2.59       0.52         0.472         15.10
+Scaling models fitted to the benchmarks:
+    host          module    gpu amdahl ns/day serial fraction usl ns/day contention coherency peak nodes
+0  draco  gromacs/2016.3  False       107.213          0.2564     98.547     0.0336   0.04041        4.9
 """
-        os.path.isfile("runtimes.pdf")
+        assert os.path.isfile("runtimes.pdf")
+
+
+def test_analyze_plot_format(cli_runner, tmpdir, data):
+    """Test that the plot is written with the given name and format."""
+    with tmpdir.as_cwd():
+
+        result = cli_runner.invoke(cli.cli, [
+            'analyze',
+            '--directory={}'.format(data['analyze-files-w-errors']),
+            '--plot',
+            '--no-csv',
+            '--plot-format=svg',
+            '--plot-name=scaling',
+            '--facet=gpu',
+        ])
+        assert result.exit_code == 0
+        assert os.listdir(str(tmpdir)) == ['scaling.svg']
+
+
+def test_plot_analysis(tmpdir):
+    """Test plots of several hosts and modules."""
+    rows = [
+        dict(zip(COLUMNS, (module, n, 10. * n / gpu_speedup, 15, gpu, host,
+                           np.nan if module == 'namd' else 32 * n)))
+        for host in ['draco', 'hydra']
+        for module in ['gromacs/2018', 'namd']
+        for gpu, gpu_speedup in [(False, 1), (True, 2)]
+        for n in [1, 2, 4]
+    ]
+    df = build_dataframe(rows)
+
+    with tmpdir.as_cwd():
+        plot_analysis(df, output_name='overlay')
+        plot_analysis(
+            df,
+            facets=['host', 'module'],
+            output_name='facets.png',
+            output_format='png')
+        plot_analysis(df, ncores=16, facets=GROUP_COLUMNS)
+        assert sorted(os.listdir(str(tmpdir))) == [
+            'facets.png', 'overlay.pdf', 'runtimes.pdf'
+        ]
+
+
+def test_analyze_no_csv(cli_runner, tmpdir, data):
+    """Test that plotting does not need the CSV file."""
+    with tmpdir.as_cwd():
+
+        result = cli_runner.invoke(cli.cli, [
+            'analyze',
+            '--directory={}'.format(data['analyze-files-w-errors']),
+            '--plot',
+            '--no-csv',
+        ])
+        assert result.exit_code == 0
+        assert os.listdir(str(tmpdir)) == ['runtimes.pdf']
+
+        result = cli_runner.invoke(cli.cli, [
+            'analyze',
+            '--directory={}'.format(data['analyze-files-gromacs']),
+            '--output-name=results',
+        ])
+        assert result.exit_code == 0
+        assert sorted(os.listdir(str(tmpdir))) == ['results.csv', 'runtimes.pdf']
 
 
 def test_analyze_console_messages(cli_runner, tmpdir):
@@ -105,3 +325,183 @@ def test_analyze_console_messages(cli_runner, tmpdir):
         output = "ERROR There is no data for the given path.\n"
         assert result.exit_code == 1
         assert result.output == output
+
+
+def test_analyze_benchmark_input_hash(tmpdir):
+    """Test that we report the hash of the input files of a benchmark."""
+    sim = mds.Sim(
+        str(tmpdir.join('1')),
+        categories={
+            'module': 'gromacs/2016',
+            'gpu': False,
+            'nodes': 1,
+            'host': 'draco',
+            'time': 15,
+            'input_hash': 'abc'
+        })
+    row = analyze_benchmark(sim)
+    assert row['input hash'] == 'abc'
+    assert np.isnan(row['ns/day'])
+
+
+def test_build_dataframe():
+    """Test that the results are assembled into typed columns."""
+    rows = [
+        dict(zip(COLUMNS, ('gromacs/2016.3', 1, 98.147, 15, False, 'draco', 32)),
+             **{'Force [%]': 70.1}),
+        dict(zip(COLUMNS, ('gromacs/2016.3', 2, np.nan, 15, True, 'draco', np.nan))),
+    ]
+    df = build_dataframe(rows)
+    assert list(df.columns) == COLUMNS + ['Force [%]']
+    assert df['module'].dtype.name == 'category'
+    assert df['host'].dtype.name == 'category'
+    assert df['gpu'].dtype == bool
+    assert df['nodes'].dtype == np.int64
+    assert df['ns/day'].dtype == np.float64
+    assert df['ncores'].dtype.name == 'Int64'
+    assert df['ncores'].isnull().tolist() == [False, True]
+    assert df['Force [%]'].dtype == np.float64
+    assert df['Force [%]'].isnull().tolist() == [False, True]
+
+    df = build_dataframe([])
+    assert df.empty
+    assert list(df.columns) == COLUMNS
+
+
+def test_calc_scaling():
+    """Test the speedup, efficiency and costs of each group of benchmarks."""
+    rows = [
+        dict(zip(COLUMNS, ('gromacs/2016.3', 1, np.nan, 15, False, 'draco', np.nan))),
+        dict(zip(COLUMNS, ('gromacs/2016.3', 2, 10., 15, False, 'draco', 64))),
+        dict(zip(COLUMNS, ('gromacs/2016.3', 4, 16., 15, False, 'draco', 128))),
+        dict(zip(COLUMNS, ('gromacs/2016.3', 1, 20., 15, True, 'draco', 32))),
+        dict(zip(COLUMNS, ('gromacs/2016.3', 2, 30., 15, True, 'draco', 64))),
+    ]
+    df = calc_scaling(build_dataframe(rows))
+    assert list(df.columns) == COLUMNS + SCALING_COLUMNS
+    np.testing.assert_allclose(df['speedup'], [np.nan, 1., 1.6, 1., 1.5])
+    np.testing.assert_allclose(df['efficiency'],
+                               [np.nan, 1., 0.8, 1., 0.75])
+    np.testing.assert_allclose(df['node-hours/ns'],
+                               [np.nan, 4.8, 6., 1.2, 1.6])
+    np.testing.assert_allclose(df['core-hours/ns'],
+                               [np.nan, 153.6, 192., 38.4, 51.2])
+
+    # Groups without a finished baseline benchmark have no speedup.
+    df = calc_scaling(build_dataframe(rows), baseline_nodes=4, ncores=10)
+    np.testing.assert_allclose(df['speedup'],
+                               [np.nan, 0.625, 1., np.nan, np.nan])
+    np.testing.assert_allclose(df['efficiency'],
+                               [np.nan, 1.25, 1., np.nan, np.nan])
+    np.testing.assert_allclose(df['core-hours/ns'],
+                               [np.nan, 48., 60., 12., 16.])
+
+
+def test_calc_scaling_layout():
+    """Test that benchmarks with different layouts are separate groups."""
+    rows = [
+        dict(zip(COLUMNS, ('gromacs/2016.3', 1, 10., 15, False, 'draco', 32))),
+        dict(zip(COLUMNS, ('gromacs/2016.3', 2, 15., 15, False, 'draco', 64))),
+        dict(zip(COLUMNS, ('gromacs/2016.3', 1, 12., 15, False, 'draco', 32)),
+             ranks=16, threads=2),
+        dict(zip(COLUMNS, ('gromacs/2016.3', 2, 24., 15, False, 'draco', 64)),
+             ranks=16, threads=2),
+    ]
+    df = build_dataframe(rows)
+    # Benchmarks without a layout use the defaults of the job template.
+    assert df['ranks'].tolist() == [0, 0, 16, 16]
+    assert df['threads'].tolist() == [0, 0, 2, 2]
+    assert group_columns(df) == GROUP_COLUMNS + ['ranks', 'threads']
+
+    df = calc_scaling(df)
+    np.testing.assert_allclose(df['speedup'], [1., 1.5, 1., 2.])
+    assert len(fit_scaling(df)) == 2
+    assert len(recommend_nodes(df)) == 2
+
+
+def test_series_label():
+    assert series_label(['host', 'gpu'], ['draco', True]) == 'draco GPU'
+    assert series_label(['ranks', 'threads'], [16, 2]) == '16 ranks 2 threads'
+    assert series_label(['module', 'ranks'], ['gromacs', 0]) == 'gromacs'
+    assert series_label(['npme', 'nb', 'dlb'], [4, 'gpu', 'auto']) == \
+        '-npme 4 -nb gpu'
+
+
+def test_fit_scaling():
+    """Test that the parameters of the scaling models are recovered."""
+    nodes = np.arange(1, 7)
+    rows = [
+        dict(zip(COLUMNS, ('gromacs/2016.3', n, p, 15, False, 'draco', 32 * n)))
+        for n, p in zip(nodes, usl(nodes, 100., 0.05, 0.01))
+    ]
+    rows += [
+        dict(zip(COLUMNS, ('gromacs/2016.3', n, p, 15, True, 'draco', 32 * n)))
+        for n, p in zip(nodes[:2], amdahl(nodes[:2], 200., 0.2))
+    ]
+    rows.append(
+        dict(zip(COLUMNS, ('namd', 1, 1., 15, False, 'draco', 32))))
+    rows.append(
+        dict(zip(COLUMNS, ('namd', 2, np.nan, 15, False, 'draco', 64))))
+
+    fits = fit_scaling(build_dataframe(rows))
+    assert list(fits.columns) == FIT_COLUMNS
+    assert len(fits) == 3
+
+    cpu = fits.loc[('draco', 'gromacs/2016.3', False)]
+    np.testing.assert_allclose(
+        cpu[['usl ns/day', 'contention', 'coherency']], [100., 0.05, 0.01])
+    np.testing.assert_allclose(cpu['peak nodes'], np.sqrt(0.95 / 0.01))
+
+    # Two different numbers of nodes are only enough for Amdahl's law.
+    gpu = fits.loc[('draco', 'gromacs/2016.3', True)]
+    np.testing.assert_allclose(gpu[['amdahl ns/day', 'serial fraction']],
+                               [200., 0.2])
+    assert gpu[['usl ns/day', 'contention', 'coherency',
+                'peak nodes']].isnull().all()
+
+    # Benchmarks that did not finish are ignored.
+    assert fits.loc[('draco', 'namd', False)].isnull().all()
+
+
+def test_recommend_nodes():
+    """Test the recommended and the cheapest number of nodes."""
+    rows = [
+        dict(zip(COLUMNS, ('gromacs/2016.3', 1, 10., 15, False, 'draco', 32))),
+        dict(zip(COLUMNS, ('gromacs/2016.3', 2, 19., 15, False, 'draco', 64))),
+        dict(zip(COLUMNS, ('gromacs/2016.3', 4, 28., 15, False, 'draco', 128))),
+        dict(zip(COLUMNS, ('gromacs/2016.3', 8, 40., 15, False, 'draco', 256))),
+        dict(zip(COLUMNS, ('gromacs/2016.3', 1, np.nan, 15, True, 'draco', np.nan))),
+    ]
+    df = calc_scaling(build_dataframe(rows))
+
+    recommendations = recommend_nodes(df)
+    assert list(recommendations.columns) == RECOMMEND_COLUMNS
+    cpu = recommendations.loc[('draco', 'gromacs/2016.3', False)]
+    assert cpu['nodes'] == 2
+    assert cpu['ns/day'] == 19.
+    assert cpu['cheapest nodes'] == 1
+    np.testing.assert_allclose(cpu['core-hours/ns'], 76.8)
+
+    recommendations = recommend_nodes(df, min_efficiency=0.5)
+    assert recommendations.loc[('draco', 'gromacs/2016.3', False),
+                               'nodes'] == 8
+
+    # Groups without finished benchmarks have no recommendation.
+    assert recommendations.loc[('draco', 'gromacs/2016.3', True)].isnull().all()
+
+
+def test_recommend_nodes_efficiency_drop():
+    """Test that we stop at the first number of nodes below the threshold."""
+    rows = [
+        dict(zip(COLUMNS, ('gromacs/2016.3', n, p, 15, False, 'draco', 32 * n)))
+        for n, p in ((1, 10.), (2, 19.), (3, 21.), (4, 36.))
+    ]
+    df = calc_scaling(build_dataframe(rows))
+    np.testing.assert_allclose(df['efficiency'], [1., 0.95, 0.7, 0.9])
+
+    recommendations = recommend_nodes(df)
+    assert recommendations.loc[('draco', 'gromacs/2016.3', False),
+                               'nodes'] == 2
+    recommendations = recommend_nodes(df, min_efficiency=0.7)
+    assert recommendations.loc[('draco', 'gromacs/2016.3', False),
+                               'nodes'] == 4
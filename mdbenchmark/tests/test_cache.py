@@ -0,0 +1,133 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017 Max Linke & Michael Gecht and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import shutil
+
+import datreant.core as dtr
+import numpy as np
+from numpy.testing import assert_equal
+
+from mdbenchmark import cli
+from mdbenchmark.cache import CACHE_FILENAME, AnalyzeCache
+from mdbenchmark.ext.click_test import cli_runner
+from mdbenchmark.mdengines import gromacs
+from mdbenchmark.testing import data
+
+
+class CountingEngine(object):
+    """Wrap the GROMACS engine and count how often log files are parsed."""
+    __name__ = 'counting'
+    PARSER_VERSION = 1
+    find_output_file = staticmethod(gromacs.find_output_file)
+
+    def __init__(self):
+        self.calls = 0
+
+    def parse_output_file(self, filename):
+        self.calls += 1
+        return gromacs.parse_output_file(filename)
+
+
+def test_cache_parse(tmpdir, data):
+    """Test that unchanged log files are only parsed once."""
+    folder = str(tmpdir.join('benchmarks'))
+    shutil.copytree(data['analyze-files-gromacs'], folder)
+    sim = dtr.Treant(os.path.join(folder, '1'))
+    engine = CountingEngine()
+
+    cache = AnalyzeCache(folder)
+    values = cache.parse(sim, engine)
+    assert values['ns/day'] == 98.147
+    assert values['ncores'] == 32
+    assert_equal(cache.parse(sim, engine), values)
+    assert engine.calls == 1
+
+    # The cache is persistent
+    cache.save()
+    assert os.path.exists(os.path.join(folder, CACHE_FILENAME))
+    cache = AnalyzeCache(folder)
+    assert_equal(cache.parse(sim, engine), values)
+    assert engine.calls == 1
+
+    # Modified log files are parsed again
+    with open(os.path.join(folder, '1', 'bench.log'), 'a') as fh:
+        fh.write('\n')
+    assert_equal(cache.parse(sim, engine), values)
+    assert engine.calls == 2
+
+    # A new parser version invalidates the cache
+    engine.PARSER_VERSION = 2
+    assert_equal(cache.parse(sim, engine), values)
+    assert engine.calls == 3
+
+
+def test_cache_missing_log(tmpdir):
+    """Test that benchmarks without a log file are not cached."""
+    sim = dtr.Treant(str(tmpdir.join('1')))
+    engine = CountingEngine()
+
+    cache = AnalyzeCache(str(tmpdir))
+    assert cache.parse(sim, engine) == {}
+    assert engine.calls == 0
+    assert not cache.modified
+
+
+def test_cache_memory(tmpdir, data):
+    """Test that a cache without a directory is not stored."""
+    sim = dtr.Treant(os.path.join(data['analyze-files-gromacs'], '1'))
+    engine = CountingEngine()
+
+    cache = AnalyzeCache()
+    assert cache.filename is None
+    cache.parse(sim, engine)
+    cache.parse(sim, engine)
+    assert engine.calls == 1
+    cache.save()
+    assert cache.modified
+
+
+def test_cache_corrupt(tmpdir):
+    """Test that we ignore a corrupt cache file."""
+    with open(str(tmpdir.join(CACHE_FILENAME)), 'w') as fh:
+        fh.write('{not json')
+
+    cache = AnalyzeCache(str(tmpdir))
+    assert cache.entries == {}
+
+
+def test_analyze_cache(cli_runner, tmpdir, data):
+    """Test that the cached analysis yields the same output."""
+    folder = str(tmpdir.join('benchmarks'))
+    shutil.copytree(data['analyze-files-w-errors'], folder)
+
+    with tmpdir.as_cwd():
+        result = cli_runner.invoke(cli.cli, ['analyze', '--directory={}'.format(folder)])
+        for _ in range(2):
+            cached_result = cli_runner.invoke(
+                cli.cli, ['analyze', '--directory={}'.format(folder), '--cache'])
+            assert cached_result.exit_code == 0
+            assert cached_result.output == result.output
+        assert os.path.exists(os.path.join(folder, CACHE_FILENAME))
+
+        cache = AnalyzeCache(folder)
+        # One benchmark has no log file
+        assert len(cache.entries) == 7
+        assert any(np.isnan(entry['values']['ns/day'])
+                   for entry in cache.entries.values())
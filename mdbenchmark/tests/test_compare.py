@@ -0,0 +1,137 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017 Max Linke & Michael Gecht and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import numpy as np
+import pandas as pd
+import pytest
+
+from mdbenchmark import cli
+from mdbenchmark.analyze import COLUMNS, build_dataframe
+from mdbenchmark.compare import (COMPARE_COLUMNS, RESULT_COLUMNS,
+                                 compare_results, module_family)
+from mdbenchmark.ext.click_test import cli_runner
+from mdbenchmark.testing import data
+
+
+def results(module, performance, nodes=1, gpu=False):
+    rows = [
+        dict(zip(COLUMNS, (module, nodes, p, 15, gpu, 'draco', 32)))
+        for p in performance
+    ]
+    return build_dataframe(rows)
+
+
+@pytest.mark.parametrize('module, family', [
+    ('gromacs/2018.3', 'gromacs/2018'),
+    ('gromacs/2018', 'gromacs/2018'),
+    ('gromacs/5.1.4-plumed2.3', 'gromacs/5'),
+    ('gromacs/2019-beta', 'gromacs/2019'),
+    ('namd', 'namd'),
+])
+def test_module_family(module, family):
+    """Test that patch versions belong to the same module family."""
+    assert module_family(module) == family
+
+
+def test_compare_results():
+    """Test that only significant slowdowns are regressions."""
+    baseline = pd.concat([
+        results('gromacs/2018.1', [100., 101., 99.]),
+        results('gromacs/2018.1', [200.], nodes=2),
+        results('gromacs/2018.1', [50., 70., 30.], gpu=True),
+        results('gromacs/2016.4', [10.]),
+    ])
+    current = pd.concat([
+        results('gromacs/2018.3', [90., 91., 89.]),
+        results('gromacs/2018.3', [195.], nodes=2),
+        results('gromacs/2018.3', [40., 42., 38.], gpu=True),
+        results('gromacs/2018.3', [np.nan], nodes=4),
+    ])
+
+    df = compare_results(baseline, current)
+    assert list(df.columns) == COMPARE_COLUMNS + RESULT_COLUMNS
+    df = df.set_index(['nodes', 'gpu'])
+    assert len(df) == 3
+    np.testing.assert_allclose(df['change [%]'], [-10., -20., -2.5])
+    assert np.isnan(df.loc[(2, False), 'z'])
+    # The GPU slowdown is within the noise of the baseline.
+    assert df['regression'].tolist() == [True, False, False]
+
+    df = compare_results(baseline, current, tolerance=0.02, sigma=0.5)
+    assert df['regression'].tolist() == [True, True, True]
+
+
+def test_compare_results_layout():
+    """Test that benchmarks are only compared with the same layout."""
+    baseline = results('gromacs/2018.1', [100.])
+    current = pd.concat([
+        results('gromacs/2018.3', [99.]),
+        results('gromacs/2018.3', [120.]).assign(ranks=16),
+    ])
+
+    df = compare_results(baseline, current)
+    assert list(df.columns) == COMPARE_COLUMNS + ['ranks'] + RESULT_COLUMNS
+    assert df['ranks'].tolist() == [0]
+    np.testing.assert_allclose(df['change [%]'], [-1.])
+
+
+def test_compare(cli_runner, tmpdir, data):
+    """Test that the exit code shows performance regressions."""
+    with tmpdir.as_cwd():
+        result = cli_runner.invoke(cli.cli, [
+            'analyze', '--directory={}'.format(data['analyze-files-gromacs']),
+            '--output-name=baseline'
+        ])
+        assert result.exit_code == 0
+
+        result = cli_runner.invoke(cli.cli, [
+            'compare', 'baseline.csv',
+            '--directory={}'.format(data['analyze-files-gromacs'])
+        ])
+        assert result.exit_code == 0
+        assert result.output.endswith('No performance regressions found.\n')
+
+        df = pd.read_csv('baseline.csv', index_col=0)
+        df.loc[df['nodes'] == 2, 'ns/day'] = 200.
+        df.to_csv('faster.csv')
+
+        result = cli_runner.invoke(cli.cli, [
+            'compare', 'faster.csv', '--results=baseline.csv'
+        ])
+        assert result.exit_code == 1
+        assert result.output == (
+            '    host        family  nodes    gpu'
+            ' baseline ns/day   ns/day change [%]  z  regression\n'
+            '0  draco  gromacs/2016      1  False'
+            '          98.147   98.147        0.0  ?       False\n'
+            '1  draco  gromacs/2016      2  False'
+            '         200.000  178.044      -11.0  ?        True\n'
+            '2  draco  gromacs/2016      3  False'
+            '         226.108  226.108        0.0  ?       False\n'
+            '3  draco  gromacs/2016      4  False'
+            '         246.973  246.973        0.0  ?       False\n'
+            '4  draco  gromacs/2016      5  False'
+            '         254.266  254.266        0.0  ?       False\n'
+            'WARNING Found 1 performance regressions.\n'
+        )
+
+        result = cli_runner.invoke(cli.cli, [
+            'compare', 'faster.csv', '--results=faster.csv', '--tolerance=0.2'
+        ])
+        assert result.exit_code == 0
@@ -0,0 +1,102 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017 Max Linke & Michael Gecht and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import shutil
+import time
+
+import datreant.core as dtr
+import mdsynthesis as mds
+import pytest
+
+from mdbenchmark import discover
+from mdbenchmark.testing import data
+
+
+@pytest.fixture
+def index_directory(tmpdir, monkeypatch):
+    folder = str(tmpdir.join('cache'))
+    monkeypatch.setattr('mdbenchmark.discover.INDEX_DIRECTORY', folder)
+    return folder
+
+
+def test_discover(data):
+    """Test that we find the same benchmarks as `mds.discover`."""
+    folder = data['analyze-files-w-errors']
+    benchmarks = discover.discover(folder)
+    sims = mds.discover(folder)
+
+    assert len(benchmarks) == len(sims) == 8
+    assert sorted(b.uuid for b in benchmarks) == sorted(sims.uuids)
+    for sim in sims:
+        benchmark = [b for b in benchmarks if b.uuid == sim.uuid][0]
+        assert benchmark.abspath == sim.abspath
+        assert benchmark.relpath == sim.relpath
+        assert benchmark.categories == dict(sim.categories)
+
+
+def test_discover_missing_directory(tmpdir):
+    assert discover.discover(str(tmpdir.join('look_here'))) == []
+
+
+def test_discover_prune(tmpdir):
+    """Test that we neither descend into benchmarks nor hidden folders."""
+    with tmpdir.as_cwd():
+        mds.Sim('campaign/1', categories={'nodes': 1})
+        mds.Sim('campaign/1/nested', categories={'nodes': 2})
+        mds.Sim('campaign/.hidden', categories={'nodes': 3})
+        dtr.Tree('campaign/empty/').makedirs()
+
+        benchmarks = discover.discover('campaign')
+        assert [b.categories['nodes'] for b in benchmarks] == [1]
+        assert benchmarks[0].relpath == os.path.join('campaign', '1', '')
+
+
+def test_discover_index(tmpdir, monkeypatch, index_directory, data):
+    """Test that the index is reused until the benchmarks change."""
+    folder = str(tmpdir.join('campaign'))
+    shutil.copytree(data['analyze-files-gromacs'], folder)
+
+    benchmarks = discover.discover(folder, index=True)
+    assert len(benchmarks) == 5
+    assert os.path.exists(discover.index_filename(folder))
+
+    # The second discovery only reads the index.
+    def fail(directory):
+        raise AssertionError('The directory tree was searched again.')
+
+    monkeypatch.setattr('mdbenchmark.discover._scan', fail)
+    indexed = discover.discover(folder, index=True)
+    assert [b.categories for b in indexed] == \
+        [b.categories for b in benchmarks]
+
+    # Changed categories are read again.
+    sim = mds.Sim(os.path.join(folder, '1'))
+    time.sleep(0.01)
+    sim.categories['started'] = False
+    indexed = discover.discover(folder, index=True)
+    assert [b.categories['started'] for b in indexed].count(False) == 1
+
+    # New benchmarks invalidate the index.
+    monkeypatch.undo()
+    monkeypatch.setattr('mdbenchmark.discover.INDEX_DIRECTORY',
+                        index_directory)
+    time.sleep(0.01)
+    mds.Sim(os.path.join(folder, '6'), categories={'nodes': 6})
+    assert len(discover.discover(folder, index=True)) == 6
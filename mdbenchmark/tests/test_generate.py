@@ -18,15 +18,20 @@
 # You should have received a copy of the GNU General Public License
 # along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
 import os
+import threading
+import time
 
+import mdsynthesis as mds
 import pytest
 from click import exceptions
 
-from mdbenchmark import cli
+from mdbenchmark import cli, console
 from mdbenchmark.ext.click_test import cli_runner
+from mdbenchmark.mdengines import gromacs
 from mdbenchmark.generate import (print_known_hosts, validate_hosts,
-                                  validate_module, validate_name,
-                                  validate_number_of_nodes)
+                                  validate_mdrun_flags, validate_module,
+                                  validate_name, validate_number_of_nodes)
+from mdbenchmark.staging import hash_file
 
 DIR_STRUCTURE = {
     'applications': {
@@ -295,6 +300,27 @@ def test_validate_generate_number_of_nodes():
     assert validate_number_of_nodes(min_nodes=1, max_nodes=6) is None
 
 
+def test_validate_mdrun_flags():
+    """Test that contradictory mdrun options are rejected."""
+    for nb in ((), ('cpu', ), ('cpu', 'gpu')):
+        with pytest.raises(exceptions.BadParameter) as error:
+            validate_mdrun_flags({'nb': nb, 'pme': ('gpu', )}, 1, ())
+        assert str(error.value).startswith(
+            'GROMACS can only compute PME on GPUs if the nonbonded')
+
+    with pytest.raises(exceptions.BadParameter) as error:
+        validate_mdrun_flags({'npme': (0, 2)}, 1, (2, 4))
+    assert str(error.value) == 'The number of separate PME ranks must be ' \
+        'smaller than the total number of MPI ranks, which is 2 for the ' \
+        'smallest benchmark.'
+
+    assert validate_mdrun_flags({'nb': ('gpu', ), 'pme': ('gpu', )}, 1,
+                                ()) is None
+    assert validate_mdrun_flags({'npme': (2, )}, 2, (2, )) is None
+    # Without --ranks the template decides about the number of ranks.
+    assert validate_mdrun_flags({'npme': (2, )}, 1, ()) is None
+
+
 def test_validate_generate_host(ctx_mock):
     """Test that the validate_generate_host function works as expected."""
 
@@ -310,3 +336,258 @@ def test_validate_generate_host(ctx_mock):
 
     # Test success of existent hostname
     assert validate_hosts(ctx_mock, None, host='draco') == 'draco'
+
+
+def test_generate_staging(cli_runner, monkeypatch, tmpdir):
+    """Test that we link the input files and fall back to copying them."""
+    with tmpdir.as_cwd():
+        with open('protein.tpr', 'w') as fh:
+            fh.write('This is a dummy tpr ;)')
+
+        monkeypatch.setattr('mdbenchmark.mdengines.get_available_modules',
+                            lambda: {'gromacs': ['2016']})
+
+        result = cli_runner.invoke(cli.cli, [
+            'generate', '--module=gromacs/2016', '--host=draco',
+            '--max-nodes=2', '--name=protein', '--staging=hardlink'
+        ])
+        assert result.exit_code == 0
+        for i in range(1, 3):
+            assert os.path.samefile(
+                'protein.tpr', 'draco_gromacs/2016/{}/protein.tpr'.format(i))
+
+        def link(source, destination):
+            raise OSError(18, 'Invalid cross-device link')
+
+        monkeypatch.setattr(os, 'link', link)
+        result = cli_runner.invoke(cli.cli, [
+            'generate', '--module=gromacs/2016', '--host=draco',
+            '--max-nodes=2', '--name=protein', '--staging=hardlink'
+        ])
+        output = 'Creating benchmark system for gromacs/2016.\n' \
+                 'Creating a total of 2 benchmarks, with a run time of 15' \
+                 ' minutes each.\n' \
+                 'WARNING Cannot hardlink the input files, copying them' \
+                 ' instead.\n' \
+                 'Finished generating all benchmarks.\nYou can' \
+                 ' now submit the jobs with mdbenchmark submit.\n'
+        assert result.exit_code == 0
+        assert result.output == output
+        for i in range(1, 3):
+            assert not os.path.samefile(
+                'protein.tpr', 'draco_gromacs/2016/{}/protein.tpr'.format(i))
+
+
+def test_generate_input_store(cli_runner, monkeypatch, tmpdir):
+    """Test that the benchmarks refer to the input files in the store."""
+    with tmpdir.as_cwd():
+        with open('protein.tpr', 'w') as fh:
+            fh.write('This is a dummy tpr ;)')
+
+        monkeypatch.setattr('mdbenchmark.mdengines.get_available_modules',
+                            lambda: {'gromacs': ['2016']})
+
+        result = cli_runner.invoke(cli.cli, [
+            'generate', '--module=gromacs/2016', '--host=draco',
+            '--max-nodes=2', '--name=protein', '--input-store=store'
+        ])
+        assert result.exit_code == 0
+
+        digest = hash_file('protein.tpr')
+        stored = os.path.join('store', digest[:2], digest)
+        for i in range(1, 3):
+            folder = 'draco_gromacs/2016/{}'.format(i)
+            assert os.path.islink(os.path.join(folder, 'protein.tpr'))
+            assert os.path.samefile(stored, os.path.join(folder,
+                                                         'protein.tpr'))
+            assert mds.Sim(folder).categories['input_hash'] == digest
+
+
+@pytest.mark.parametrize('jobs', (1, 4))
+def test_generate_jobs(cli_runner, monkeypatch, tmpdir, jobs):
+    """Test that failed benchmarks are reported and removed again."""
+    with tmpdir.as_cwd():
+        with open('protein.tpr', 'w') as fh:
+            fh.write('This is a dummy tpr ;)')
+
+        monkeypatch.setattr('mdbenchmark.mdengines.get_available_modules',
+                            lambda: {'gromacs': ['2016', '2018']})
+
+        write_bench = gromacs.write_bench
+
+        def failing_write_bench(**kwargs):
+            staged = write_bench(**kwargs)
+            if kwargs['nodes'] == 2 and kwargs['module'] == 'gromacs/2018':
+                raise IOError('Disk quota exceeded')
+            return staged
+
+        monkeypatch.setattr(gromacs, 'write_bench', failing_write_bench)
+
+        result = cli_runner.invoke(cli.cli, [
+            'generate', '--module=gromacs/2016', '--module=gromacs/2018',
+            '--host=draco', '--max-nodes=3', '--name=protein',
+            '--jobs={}'.format(jobs)
+        ])
+        output = 'Creating benchmark system for gromacs/2016.\n' \
+                 'Creating a total of 6 benchmarks, with a run time of 15' \
+                 ' minutes each.\n' \
+                 'Creating benchmark system for gromacs/2018.\n' \
+                 'Creating a total of 6 benchmarks, with a run time of 15' \
+                 ' minutes each.\n' \
+                 'WARNING Could not generate the benchmark of gromacs/2018' \
+                 ' in folder 2: Disk quota exceeded\n' \
+                 'ERROR Could not generate 1 of 6 benchmarks.\n'
+        assert result.exit_code == 1
+        assert result.output == output
+
+        for module in ('2016', '2018'):
+            for i in range(1, 4):
+                folder = 'draco_gromacs/{}/{}'.format(module, i)
+                failed = module == '2018' and i == 2
+                assert os.path.exists(folder) != failed
+
+
+@pytest.mark.parametrize('jobs', (1, 2))
+def test_generate_jobs_stop(cli_runner, monkeypatch, tmpdir, jobs):
+    """Test that no further benchmarks are written once an engine stops."""
+    with tmpdir.as_cwd():
+        with open('protein.tpr', 'w') as fh:
+            fh.write('This is a dummy tpr ;)')
+
+        monkeypatch.setattr('mdbenchmark.mdengines.get_available_modules',
+                            lambda: {'gromacs': ['2016']})
+
+        write_bench = gromacs.write_bench
+        started = threading.Event()
+
+        def stopping_write_bench(**kwargs):
+            if kwargs['nodes'] == 1:
+                # In parallel, the next benchmark is already being written
+                # when the first one fails.
+                if jobs > 1:
+                    started.wait(5)
+                console.error('Cannot write the benchmark.')
+            started.set()
+            time.sleep(0.1)
+            return write_bench(**kwargs)
+
+        monkeypatch.setattr(gromacs, 'write_bench', stopping_write_bench)
+
+        result = cli_runner.invoke(cli.cli, [
+            'generate', '--module=gromacs/2016', '--host=draco',
+            '--max-nodes=6', '--name=protein', '--jobs={}'.format(jobs)
+        ])
+        assert result.exit_code == 1
+        assert result.output.endswith('ERROR Cannot write the benchmark.\n')
+
+        written = [
+            os.path.exists('draco_gromacs/2016/{}'.format(i))
+            for i in range(1, 7)
+        ]
+        assert written == [False, jobs > 1, False, False, False, False]
+
+
+def test_generate_layout_sweep(cli_runner, monkeypatch, tmpdir):
+    """Test that we generate a benchmark for every layout and node count."""
+    with tmpdir.as_cwd():
+        with open('protein.tpr', 'w') as fh:
+            fh.write('This is a dummy tpr ;)')
+
+        monkeypatch.setattr('mdbenchmark.mdengines.get_available_modules',
+                            lambda: {'gromacs': ['2016']})
+
+        result = cli_runner.invoke(cli.cli, [
+            'generate', '--module=gromacs/2016', '--host=draco',
+            '--max-nodes=2', '--name=protein', '--ranks=16', '--ranks=32',
+            '--threads=2'
+        ])
+        output = 'Creating benchmark system for gromacs/2016.\n' \
+                 'Creating a total of 4 benchmarks, with a run time of 15' \
+                 ' minutes each.\n' \
+                 'Finished generating all benchmarks.\nYou can' \
+                 ' now submit the jobs with mdbenchmark submit.\n'
+        assert result.exit_code == 0
+        assert result.output == output
+
+        for nodes in (1, 2):
+            for ranks in (16, 32):
+                folder = 'draco_gromacs/2016/{}_{}ranks_2threads'.format(
+                    nodes, ranks)
+                categories = mds.Sim(folder).categories
+                assert categories['nodes'] == nodes
+                assert categories['ranks'] == ranks
+                assert categories['threads'] == 2
+
+                with open(os.path.join(folder, 'bench.job')) as fh:
+                    script = fh.read()
+                assert '--ntasks-per-node={}\n'.format(ranks) in script
+                assert '--cpus-per-task=2\n' in script
+                assert script.rstrip().endswith('-deffnm protein -ntomp 2')
+
+
+def test_generate_mdrun_sweep(cli_runner, monkeypatch, tmpdir):
+    """Test that we generate a benchmark for every set of mdrun options."""
+    with tmpdir.as_cwd():
+        with open('protein.tpr', 'w') as fh:
+            fh.write('This is a dummy tpr ;)')
+
+        monkeypatch.setattr('mdbenchmark.mdengines.get_available_modules',
+                            lambda: {'gromacs': ['2018']})
+
+        result = cli_runner.invoke(cli.cli, [
+            'generate', '--module=gromacs/2018', '--host=draco',
+            '--max-nodes=1', '--name=protein', '--npme=0', '--npme=4',
+            '--nb=gpu', '--dlb=no', '--dlb=yes'
+        ])
+        output = 'Creating benchmark system for gromacs/2018.\n' \
+                 'Creating a total of 4 benchmarks, with a run time of 15' \
+                 ' minutes each.\n' \
+                 'Finished generating all benchmarks.\nYou can' \
+                 ' now submit the jobs with mdbenchmark submit.\n'
+        assert result.exit_code == 0
+        assert result.output == output
+
+        for npme in (0, 4):
+            for dlb in ('no', 'yes'):
+                folder = 'draco_gromacs/2018/1_npme{}_nbgpu_dlb{}'.format(
+                    npme, dlb)
+                categories = mds.Sim(folder).categories
+                assert categories['npme'] == npme
+                assert categories['nb'] == 'gpu'
+                assert categories['dlb'] == dlb
+                assert 'pme' not in categories
+
+                with open(os.path.join(folder, 'bench.job')) as fh:
+                    script = fh.read()
+                assert script.rstrip().endswith(
+                    '-deffnm protein -npme {} -nb gpu -dlb {}'.format(
+                        npme, dlb))
+
+
+def test_generate_mdrun_sweep_template(cli_runner, monkeypatch, tmpdir):
+    """Test that the mdrun options are only swept with templates using them."""
+    with tmpdir.as_cwd():
+        with open('protein.tpr', 'w') as fh:
+            fh.write('This is a dummy tpr ;)')
+
+        monkeypatch.setattr('mdbenchmark.mdengines.get_available_modules',
+                            lambda: {'gromacs': ['2018']})
+        monkeypatch.setattr('mdbenchmark.utils.template_variables',
+                            lambda tmpl: {'name', 'time'})
+
+        result = cli_runner.invoke(cli.cli, [
+            'generate', '--module=gromacs/2018', '--host=draco',
+            '--max-nodes=1', '--name=protein', '--dlb=no', '--dlb=yes'
+        ])
+        assert result.exit_code == 1
+        assert result.output == 'ERROR The template draco does not pass ' \
+            'the mdrun options to GROMACS. Add {{ mdrun_flags }} to its ' \
+            'mdrun command.\n'
+        assert not os.path.exists('draco_gromacs/2018')
+
+        result = cli_runner.invoke(cli.cli, [
+            'generate', '--module=gromacs/2018', '--host=draco',
+            '--max-nodes=1', '--name=protein', '--ranks=1', '--npme=1'
+        ])
+        assert result.exit_code == 2
+        assert not os.path.exists('draco_gromacs/2018')
@@ -0,0 +1,95 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017 Max Linke & Michael Gecht and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import datetime as dt
+import os
+
+from mdbenchmark import cli
+from mdbenchmark.analyze import COLUMNS, build_dataframe
+from mdbenchmark.ext.click_test import cli_runner
+from mdbenchmark.store import write_store
+
+
+def write_results(filename):
+    rows = [
+        dict(zip(COLUMNS, ('gromacs/2018', 1, 10., 15, False, 'draco', 32)),
+             uuid='a'),
+        dict(zip(COLUMNS, ('gromacs/2018', 2, 19., 15, False, 'draco', 64)),
+             uuid='b'),
+        dict(zip(COLUMNS, ('gromacs/2018', 1, 30., 15, True, 'hydra', 20)),
+             uuid='c'),
+    ]
+    write_store(build_dataframe(rows), filename, date=dt.datetime(2018, 1, 1))
+    write_store(
+        build_dataframe([
+            dict(zip(COLUMNS, ('gromacs/2019', 1, 12., 15, False, 'draco',
+                               32)),
+                 uuid='d')
+        ]),
+        filename,
+        date=dt.datetime(2019, 1, 1))
+
+
+def test_query(cli_runner, tmpdir):
+    """Test that the selected benchmarks are shown."""
+    with tmpdir.as_cwd():
+        write_results('results.db')
+
+        result = cli_runner.invoke(
+            cli.cli, ['query', 'results.db', '--host=draco', '--nodes=1'])
+        assert result.exit_code == 0
+        assert result.output == (
+            '                  date        module  nodes  ns/day'
+            '  run time [min]    gpu   host  ncores\n'
+            '0  2018-01-01 00:00:00  gromacs/2018      1    10.0'
+            '              15  False  draco      32\n'
+            '1  2019-01-01 00:00:00  gromacs/2019      1    12.0'
+            '              15  False  draco      32\n'
+        )
+
+        result = cli_runner.invoke(cli.cli, [
+            'query', 'results.db', '--cpu', '--since=2018-06-01',
+            '--output-name=draco'
+        ])
+        assert result.exit_code == 0
+        assert result.output == (
+            '                  date        module  nodes  ns/day'
+            '  run time [min]    gpu   host  ncores\n'
+            '0  2019-01-01 00:00:00  gromacs/2019      1    12.0'
+            '              15  False  draco      32\n'
+        )
+        assert os.path.exists('draco.csv')
+
+
+def test_query_console_messages(cli_runner, tmpdir):
+    """Test the error messages of the query command."""
+    with tmpdir.as_cwd():
+        write_results('results.db')
+
+        result = cli_runner.invoke(cli.cli,
+                                   ['query', 'results.db', '--module=namd'])
+        assert result.exit_code == 1
+        assert result.output == 'ERROR There are no matching benchmarks in ' \
+            'the result store.\n'
+
+        result = cli_runner.invoke(
+            cli.cli, ['query', 'results.db', '--since=January'])
+        assert result.exit_code == 1
+        assert result.output == 'ERROR Dates must be given as YYYY-MM-DD, ' \
+            'not January.\n'
@@ -0,0 +1,138 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017 Max Linke & Michael Gecht and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import os
+
+import pytest
+
+from mdbenchmark import staging
+
+
+@pytest.fixture
+def source(tmpdir):
+    source = tmpdir.join('protein.tpr')
+    source.write('This is a dummy tpr ;)')
+    return str(source)
+
+
+@pytest.mark.parametrize('method', ('copy', 'hardlink', 'symlink'))
+def test_stage_file(tmpdir, source, method):
+    destination = str(tmpdir.mkdir('1').join('protein.tpr'))
+    assert staging.stage_file(source, destination, method) == method
+    with open(destination) as fh:
+        assert fh.read() == 'This is a dummy tpr ;)'
+    assert os.path.samefile(source, destination) == (method != 'copy')
+    assert os.path.islink(destination) == (method == 'symlink')
+
+
+def test_stage_file_reflink(tmpdir, source):
+    """Test that we clone the file or copy it, if the file system cannot."""
+    destination = str(tmpdir.mkdir('1').join('protein.tpr'))
+    assert staging.stage_file(source, destination, 'reflink') in ('reflink',
+                                                                  'copy')
+    with open(destination) as fh:
+        assert fh.read() == 'This is a dummy tpr ;)'
+    assert not os.path.samefile(source, destination)
+
+
+def test_stage_file_fallback(monkeypatch, tmpdir, source):
+    """Test that we copy the file, if it cannot be linked."""
+
+    def link(source, destination):
+        raise OSError(18, 'Invalid cross-device link')
+
+    monkeypatch.setattr(os, 'link', link)
+    destination = str(tmpdir.mkdir('1').join('protein.tpr'))
+    assert staging.stage_file(source, destination, 'hardlink') == 'copy'
+    with open(destination) as fh:
+        assert fh.read() == 'This is a dummy tpr ;)'
+
+
+
+def test_stage_file_reflink_fallback(monkeypatch, tmpdir, source):
+    """Test that we copy the file, if the file system cannot clone it."""
+
+    def ioctl(fd, request, arg):
+        raise IOError(95, 'Operation not supported')
+
+    monkeypatch.setattr(staging.fcntl, 'ioctl', ioctl)
+    destination = str(tmpdir.mkdir('1').join('protein.tpr'))
+    assert staging.stage_file(source, destination, 'reflink') == 'copy'
+    with open(destination) as fh:
+        assert fh.read() == 'This is a dummy tpr ;)'
+
+@pytest.mark.parametrize('method', staging.STAGING_METHODS)
+def test_stage_file_replaces_link(tmpdir, source, method):
+    """Test that staging again never writes into the input file."""
+    destination = str(tmpdir.mkdir('1').join('protein.tpr'))
+    staging.stage_file(source, destination, 'symlink')
+
+    other = tmpdir.join('other.tpr')
+    other.write('Another tpr')
+    staging.stage_file(str(other), destination, method)
+
+    with open(source) as fh:
+        assert fh.read() == 'This is a dummy tpr ;)'
+    with open(destination) as fh:
+        assert fh.read() == 'Another tpr'
+
+
+def test_input_store(tmpdir, source):
+    """Test that every distinct input file is stored once."""
+    store = staging.InputStore(str(tmpdir.join('store')))
+    path, digest = store.add(source)
+    assert digest == staging.hash_file(source)
+    assert path == str(tmpdir.join('store', digest[:2], digest))
+    with open(path) as fh:
+        assert fh.read() == 'This is a dummy tpr ;)'
+    assert not os.stat(path).st_mode & 0o222
+
+    # The same content under a different name is not stored again.
+    other = tmpdir.join('other.tpr')
+    other.write('This is a dummy tpr ;)')
+    assert store.add(str(other)) == (path, digest)
+    assert len(tmpdir.join('store').listdir()) == 1
+
+    other.write('Another tpr')
+    assert store.add(str(other))[1] != digest
+    assert len(tmpdir.join('store').listdir()) == 2
+
+
+
+def test_input_store_without_reflinks(monkeypatch, tmpdir, source):
+    """Test that files are copied into the store, if they cannot be cloned."""
+
+    def ioctl(fd, request, arg):
+        raise IOError(95, 'Operation not supported')
+
+    monkeypatch.setattr(staging.fcntl, 'ioctl', ioctl)
+    store = staging.InputStore(str(tmpdir.join('store')))
+    path, digest = store.add(source)
+    assert digest == staging.hash_file(source)
+    with open(path) as fh:
+        assert fh.read() == 'This is a dummy tpr ;)'
+    # No temporary file is left behind.
+    assert tmpdir.join('store', digest[:2]).listdir() == [tmpdir.join(
+        'store', digest[:2], digest)]
+
+def test_combine_hashes():
+    assert staging.combine_hashes(['abc']) == 'abc'
+    combined = staging.combine_hashes(['abc', 'def'])
+    assert len(combined) == 64
+    assert combined != staging.combine_hashes(['def', 'abc'])
@@ -0,0 +1,149 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017 Max Linke & Michael Gecht and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mdbenchmark import cli
+from mdbenchmark.analyze import COLUMNS, DTYPES, build_dataframe
+from mdbenchmark.ext.click_test import cli_runner
+from mdbenchmark.store import query_store, read_store, write_store
+from mdbenchmark.testing import data
+
+
+@pytest.fixture(params=['parquet', 'feather', 'db'])
+def extension(request):
+    """File extension of the result store. Parquet and Feather files require
+    pyarrow."""
+    if request.param != 'db':
+        pytest.importorskip('pyarrow')
+    return request.param
+
+
+def results(host, nodes, performance):
+    rows = [
+        dict(zip(COLUMNS, ('gromacs/2018', n, p, 15, False, host, 32 * n)),
+             uuid='{}-{}'.format(host, n))
+        for n, p in zip(nodes, performance)
+    ]
+    return build_dataframe(rows)
+
+
+def test_write_store(tmpdir, extension):
+    """Test that results are merged into the store with their types."""
+    filename = str(tmpdir.join('results.{}'.format(extension)))
+
+    write_store(results('draco', [1, 2], [10., np.nan]), filename,
+                date=dt.datetime(2018, 1, 1))
+    write_store(results('hydra', [1], [20.]), filename,
+                date=dt.datetime(2019, 1, 1))
+    # Benchmarks that are already in the store are replaced, but keep their
+    # date.
+    write_store(results('draco', [2], [18.]), filename,
+                date=dt.datetime(2019, 1, 1))
+
+    df = read_store(filename, dtypes=DTYPES)
+    assert len(df) == 3
+    assert df.set_index('uuid')['ns/day'].to_dict() == {
+        'draco-1': 10., 'hydra-1': 20., 'draco-2': 18.
+    }
+    assert df['host'].dtype.name == 'category'
+    assert df['ncores'].dtype.name == 'Int64'
+    assert df['gpu'].dtype == bool
+    assert df.set_index('uuid')['date'].to_dict() == {
+        'draco-1': '2018-01-01 00:00:00',
+        'hydra-1': '2019-01-01 00:00:00',
+        'draco-2': '2018-01-01 00:00:00',
+    }
+
+    # Only the requested columns are read.
+    df = read_store(filename, columns=['host', 'ns/day'])
+    assert sorted(df.columns) == ['host', 'ns/day']
+
+    write_store(results('draco', [4], [30.]), filename, append=False)
+    assert len(read_store(filename)) == 1
+
+
+def test_read_store_column_names(tmpdir, extension):
+    """Test that column names with units in brackets are read unchanged."""
+    filename = str(tmpdir.join('results.{}'.format(extension)))
+    df = results('draco', [1], [10.]).assign(**{'core time [s]': 100.})
+    write_store(df, filename)
+
+    assert set(df.columns) <= set(read_store(filename).columns)
+    df = read_store(filename, columns=['run time [min]', 'core time [s]'])
+    assert list(df.columns) == ['run time [min]', 'core time [s]']
+    assert df.values.tolist() == [[15, 100.]]
+
+
+def test_query_store(tmpdir, extension):
+    """Test that benchmarks are selected by their columns and date."""
+    filename = str(tmpdir.join('results.{}'.format(extension)))
+    write_store(results('draco', [1, 2], [10., 19.]), filename,
+                date=dt.datetime(2018, 1, 1))
+    write_store(results('hydra', [1, 2], [20., 38.]), filename,
+                date=dt.datetime(2019, 6, 1))
+
+    df = query_store(filename, host=['hydra'], nodes=[2])
+    assert df['uuid'].tolist() == ['hydra-2']
+
+    df = query_store(filename, since='2019-01-01', gpu=[False], module=None)
+    assert sorted(df['uuid']) == ['hydra-1', 'hydra-2']
+
+    df = query_store(filename, host=['draco', 'hydra'], nodes=[])
+    assert len(df) == 4
+
+    assert query_store(filename, gpu=[True]).empty
+
+
+def test_store_format(tmpdir):
+    """Test that unknown formats of the store are rejected."""
+    with pytest.raises(SystemExit):
+        write_store(pd.DataFrame(), str(tmpdir.join('results.txt')))
+
+
+def test_analyze_store(cli_runner, tmpdir, data):
+    """Test that repeated analysis does not duplicate the stored results."""
+    pytest.importorskip('pyarrow')
+    with tmpdir.as_cwd():
+        for _ in range(2):
+            result = cli_runner.invoke(cli.cli, [
+                'analyze',
+                '--directory={}'.format(data['analyze-files-gromacs']),
+                '--no-csv',
+                '--store=results.parquet',
+            ])
+            assert result.exit_code == 0
+
+        df = read_store('results.parquet')
+        assert len(df) == 5
+        assert sorted(df['nodes']) == [1, 2, 3, 4, 5]
+
+        result = cli_runner.invoke(cli.cli, [
+            'analyze',
+            '--directory={}'.format(data['analyze-files-gromacs']),
+            '--store=results.txt',
+        ])
+        assert result.exit_code == 1
+        assert result.output == 'ERROR Unknown format of the result store ' \
+            'results.txt. Use one of the extensions .db, .feather, .parquet, ' \
+            '.sqlite.\n'
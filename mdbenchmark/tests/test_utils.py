@@ -17,6 +17,8 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+from collections import OrderedDict
+
 import click
 import numpy as np
 import pytest
@@ -75,6 +77,12 @@ def test_retrieve_host_template(monkeypatch):
     assert utils.retrieve_host_template('minerva') == 'minerva'
 
 
+def test_template_variables():
+    """Test `template_variables` utility function."""
+    variables = utils.template_variables(utils.retrieve_host_template('draco'))
+    assert {'name', 'time', 'ranks', 'threads', 'mdrun_flags'} <= variables
+
+
 def test_lin_func():
     """Test `lin_func()`."""
     m, x, b = [5, 3, 2]
@@ -94,6 +102,20 @@ def test_calc_slope_intercept():
     assert_equal(slope_intercept, np.hstack([slope, intercept]))
 
 
+def test_amdahl():
+    """Test `amdahl()`."""
+    assert_equal(utils.amdahl(1, 10., 0.5), 10.)
+    assert_equal(utils.amdahl(3, 10., 0.5), 15.)
+    assert_equal(utils.amdahl(np.array([1, 2]), 10., 0.), [10., 20.])
+
+
+def test_usl():
+    """Test `usl()`."""
+    assert_equal(utils.usl(1, 10., 0.5, 0.1), 10.)
+    assert_equal(utils.usl(2, 10., 0.5, 0.25), 10.)
+    assert_equal(utils.usl(3, 10., 0.5, 0.), utils.amdahl(3, 10., 0.5))
+
+
 def test_guess_ncores(cli_runner, monkeypatch):
     """Test that we can guess the correct number of cores on the supported
     systems.
@@ -125,3 +147,13 @@ def test_guess_ncores(cli_runner, monkeypatch):
     result = cli_runner.invoke(test_cli, ['test'])
     assert result.exit_code == 0
     assert result.output == output
+
+
+def test_benchmark_folder():
+    assert utils.benchmark_folder(4) == '4'
+    assert utils.benchmark_folder(4, ranks=16) == '4_16ranks'
+    assert utils.benchmark_folder(4, 16, 2) == '4_16ranks_2threads'
+    assert utils.benchmark_folder(4, threads=2) == '4_2threads'
+    flags = OrderedDict([('npme', 4), ('nb', 'gpu')])
+    assert utils.benchmark_folder(
+        4, 16, mdrun_flags=flags) == '4_16ranks_npme4_nbgpu'
@@ -26,7 +26,8 @@ import sys
 import click
 import numpy as np
 import xdg
-from jinja2 import ChoiceLoader, Environment, FileSystemLoader, PackageLoader
+from jinja2 import (ChoiceLoader, Environment, FileSystemLoader, PackageLoader,
+                    meta)
 from jinja2.exceptions import TemplateNotFound
 
 from . import console
@@ -87,6 +88,22 @@ def retrieve_host_template(host=None):
     return ENV.get_template(host)
 
 
+def template_variables(tmpl):
+    """Return the names of the variables that a host template uses.
+
+    Parameter
+    ---------
+    tmpl : jinja2.Template
+      Host template as returned by `retrieve_host_template`
+
+    Returns
+    -------
+    set of str
+    """
+    source = ENV.loader.get_source(ENV, tmpl.name)[0]
+    return meta.find_undeclared_variables(ENV.parse(source))
+
+
 def lin_func(x, m, b):
     return m * x + b
 
@@ -98,6 +115,39 @@ def calc_slope_intercept(x1, y1, x2, y2):
     return np.hstack([slope, intercept])
 
 
+def amdahl(nodes, performance, serial_fraction):
+    """Performance predicted by Amdahl's law.
+
+    Parameters
+    ----------
+    nodes : array_like
+        Number of nodes.
+    performance : float
+        Performance on a single node.
+    serial_fraction : float
+        Fraction of the work that cannot be parallelized.
+    """
+    return performance * nodes / (1 + serial_fraction * (nodes - 1))
+
+
+def usl(nodes, performance, contention, coherency):
+    """Performance predicted by the Universal Scalability Law.
+
+    Parameters
+    ----------
+    nodes : array_like
+        Number of nodes.
+    performance : float
+        Performance on a single node.
+    contention : float
+        Serialization due to shared resources, like Amdahl's serial fraction.
+    coherency : float
+        Cost of keeping the nodes consistent, e.g. of communication.
+    """
+    return performance * nodes / (
+        1 + contention * (nodes - 1) + coherency * nodes * (nodes - 1))
+
+
 def guess_ncores():
     """Guess the number of physical CPU cores.
 
@@ -124,3 +174,20 @@ def generate_output_name(extension):
     date_time = dt.datetime.now().strftime("%m%d%y_%H-%M")
     out = '{}.{}'.format(date_time, extension)
     return out
+
+
+def benchmark_folder(nodes, ranks=None, threads=None, mdrun_flags=None):
+    """Return the name of the folder of a benchmark.
+
+    The folder is named after the number of nodes, e.g. `4`. The MPI ranks
+    per node, OpenMP threads per rank and GROMACS mdrun options of parameter
+    sweeps are appended, e.g. `4_16ranks_2threads_npme4_nbgpu`.
+    """
+    folder = str(nodes)
+    if ranks is not None:
+        folder += '_{}ranks'.format(ranks)
+    if threads is not None:
+        folder += '_{}threads'.format(threads)
+    for flag, value in (mdrun_flags or {}).items():
+        folder += '_{}{}'.format(flag, value)
+    return folder
@@ -64,11 +64,12 @@ setup(
         'mdsynthesis',
         'click',
         'jinja2',
-        'pandas',
+        'pandas>=0.24',
         'matplotlib',
         'python-Levenshtein',
         'xdg<2',
     ],
+    extras_require={'store': ['pyarrow']},
     entry_points={'console_scripts': ['mdbenchmark=mdbenchmark.cli:cli']},
     tests_require=['pytest'],
     zip_safe=False)